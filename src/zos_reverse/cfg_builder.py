@@ -1,5 +1,8 @@
 """Control Flow Graph builder for z/OS binary analysis"""
 
+from array import array
+from bisect import bisect_right
+from itertools import compress
 from typing import List, Dict, Set, Optional, Tuple
 import logging
 
@@ -15,94 +18,122 @@ class CFGBuilder:
     """Builds control flow graphs from disassembled instructions"""
     
     def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Clear state from a previous build so the builder can be reused"""
         self.instructions: List[Instruction] = []
-        self.instruction_map: Dict[int, Instruction] = {}
-        self.leaders: Set[int] = set()
+        self._instruction_map: Optional[Dict[int, Instruction]] = None
+        self._idx_of: Dict[int, int] = {}
+        # Leader flag per instruction index; set bits read back in address order
+        self._is_leader = bytearray()
+        self.unresolved: Set[int] = set()
         self.blocks: Dict[str, BasicBlock] = {}
+        # Sorted block start addresses with parallel block ids for bisect lookup
+        self._block_starts: List[int] = []
+        self._block_ids: List[str] = []
+        # Memoized _find_block_by_address results; blocks are fixed once created
+        self._block_at_addr_cache: Dict[int, Optional[BasicBlock]] = {}
+        
+    @property
+    def instruction_map(self) -> Dict[int, Instruction]:
+        """Address -> instruction map, built on first use
         
+        CFG construction itself only needs the index table, so the map is not
+        materialized unless a caller asks for it.
+        """
+        if self._instruction_map is None:
+            self._instruction_map = {inst.address: inst for inst in self.instructions}
+        return self._instruction_map
+    
     def build_cfg(self, disasm_result: DisassemblyResult) -> ControlFlowGraph:
         """Build complete CFG from disassembly result"""
+        self.reset()
         self.instructions = disasm_result.instructions
-        self.instruction_map = {inst.address: inst for inst in self.instructions}
+        self._instruction_map = None
+        self._idx_of = {inst.address: i for i, inst in enumerate(self.instructions)}
         
         # Find basic block leaders
         self._find_leaders(disasm_result.cfg.entry_points)
         
-        # Create basic blocks
+        # Create basic blocks and add control flow edges
         self._create_basic_blocks()
         
-        # Add control flow edges
-        unresolved = self._add_control_flow_edges()
-        
         # Assign synthetic labels to branch targets
         self._assign_synthetic_labels()
         
         # Update CFG
         cfg = disasm_result.cfg
         cfg.basic_blocks = self.blocks
-        cfg.unresolved_branches.extend(unresolved)
-        
-        # Find unresolved branches
-        self._find_unresolved_branches(cfg)
+        cfg.unresolved_branches = sorted(self.unresolved)
         
         return cfg
     
     def _find_leaders(self, entry_points: List[int]):
         """Find all basic block leaders (first instruction of each block)"""
+        instructions = self.instructions
+        idx_of = self._idx_of
+        is_leader = self._is_leader = bytearray(len(instructions))
+        last = len(instructions) - 1
+        
         # Entry points are leaders
+        has_entry = False
         for ep in entry_points:
-            if ep in self.instruction_map:
-                self.leaders.add(ep)
+            if ep in idx_of:
+                is_leader[idx_of[ep]] = 1
+                has_entry = True
         
         # First instruction is a leader if no entry points
-        if not self.leaders and self.instructions:
-            self.leaders.add(self.instructions[0].address)
+        if not has_entry and instructions:
+            is_leader[0] = 1
         
         # Process all instructions
-        for i, inst in enumerate(self.instructions):
+        for i, inst in enumerate(instructions):
             if inst.is_branch:
-                # Target of branch is a leader
-                if inst.branch_target and inst.branch_target in self.instruction_map:
-                    self.leaders.add(inst.branch_target)
+                # Target of branch is a leader; a target outside the decoded
+                # instructions is unresolved
+                target = inst.branch_target
+                if target:
+                    j = idx_of.get(target)
+                    if j is not None:
+                        is_leader[j] = 1
+                    else:
+                        self.unresolved.add(inst.address)
                     
                 # Instruction after branch is a leader (if not unconditional)
-                if not self._is_unconditional_branch(inst) and i + 1 < len(self.instructions):
-                    self.leaders.add(self.instructions[i + 1].address)
+                if not inst.is_unconditional and i < last:
+                    is_leader[i + 1] = 1
                     
-            elif inst.is_call:
-                # Instruction after call is a leader
-                if i + 1 < len(self.instructions):
-                    self.leaders.add(self.instructions[i + 1].address)
-                    
-            elif inst.is_return:
-                # Instruction after return is a leader (if exists)
-                if i + 1 < len(self.instructions):
-                    self.leaders.add(self.instructions[i + 1].address)
+            elif inst.is_call or inst.is_return:
+                # Instruction after call or return is a leader (if exists)
+                if i < last:
+                    is_leader[i + 1] = 1
     
     def _create_basic_blocks(self):
-        """Create basic blocks from leaders"""
-        sorted_leaders = sorted(self.leaders)
+        """Create basic blocks from leaders and add control flow edges
         
-        for i, leader in enumerate(sorted_leaders):
-            # Determine block end
-            if i + 1 < len(sorted_leaders):
-                # Block ends before next leader
-                end_addr = sorted_leaders[i + 1] - 1
-            else:
-                # Last block extends to end of instructions
-                if self.instructions:
-                    end_addr = self.instructions[-1].address + len(self.instructions[-1].raw_bytes) - 1
-                else:
-                    end_addr = leader
-            
-            # Collect instructions for this block
-            block_instructions = []
-            for inst in self.instructions:
-                if leader <= inst.address <= end_addr:
-                    block_instructions.append(inst)
-            
-            if not block_instructions:
-                continue
+        Fall-through edges are recorded as each block is created; branch edges
+        are resolved once all blocks exist, since targets may lie ahead. All
+        edges are then installed on the blocks in one pass.
+        """
+        instructions = self.instructions
+        blocks = self.blocks
+        
+        # Leader instruction indices, already in address order; each block runs
+        # up to the next leader, or to the end of the instructions
+        leader_idx = list(compress(range(len(instructions)), self._is_leader))
+        block_bounds = zip(leader_idx, leader_idx[1:] + [len(instructions)])
+        pending_branches: List[BasicBlock] = []
+        prev_block: Optional[BasicBlock] = None
+        prev_falls_through = False
+        # Edges as parallel (source, target) block index arrays
+        edge_src = array('I')
+        edge_dst = array('I')
+        
+        for index, (lo, hi) in enumerate(block_bounds):
+            block_instructions = instructions[lo:hi]
+            leader = block_instructions[0].address
+            last_inst = block_instructions[-1]
             
             # Determine block type
             block_type = self._determine_block_type(block_instructions)
@@ -112,96 +143,89 @@ class CFGBuilder:
             block = BasicBlock(
                 id=block_id,
                 start_address=leader,
-                end_address=block_instructions[-1].address if block_instructions else leader,
+                end_address=last_inst.address,
                 instructions=block_instructions,
-                block_type=block_type
+                block_type=block_type,
+                index=index
             )
             
-            self.blocks[block_id] = block
-    
-    def _add_control_flow_edges(self):
-        """Add edges between basic blocks"""
-        unresolved_branches = []
-        for block_id, block in self.blocks.items():
-            if not block.instructions:
-                continue
-                
-            last_inst = block.instructions[-1]
+            blocks[block_id] = block
+            self._block_starts.append(leader)
+            self._block_ids.append(block_id)
+            
+            # Fall-through edge from the previous block
+            if prev_falls_through:
+                prev_block.fall_through = block_id
+                edge_src.append(prev_block.index)
+                edge_dst.append(index)
+            prev_block = block
             
-            if last_inst.is_branch:
-                # Add edge to branch target
+            if not last_inst.is_branch:
+                # Straight-line code falls through; a return has no successors
+                prev_falls_through = not last_inst.is_return
+            else:
+                # Conditional branches fall through when not taken
+                prev_falls_through = not last_inst.is_unconditional
                 if last_inst.branch_target:
-                    target_block = self._find_block_by_address(last_inst.branch_target)
-                    if target_block:
-                        block.branch_targets.append(target_block.id)
-                        block.successors.add(target_block.id)
-                        target_block.predecessors.add(block_id)
-                    else:
-                        # Unresolved branch target
-                        unresolved_branches.append(last_inst.address)
-                        last_inst.annotation = "UNRESOLVED_TARGET"
-                elif last_inst.is_branch:
+                    pending_branches.append(block)
+                else:
                     # Indirect branch without computed target
-                    unresolved_branches.append(last_inst.address)
+                    self.unresolved.add(last_inst.address)
                     last_inst.annotation = "UNRESOLVED_TARGET (indirect)"
-                
-                # Add fall-through edge if conditional branch
-                if not self._is_unconditional_branch(last_inst):
-                    next_block = self._find_next_block(block)
-                    if next_block:
-                        block.fall_through = next_block.id
-                        block.successors.add(next_block.id)
-                        next_block.predecessors.add(block_id)
-                        
-            elif last_inst.is_return:
-                # No successors for return
-                pass
-                
+        
+        # Add edges to branch targets
+        for block in pending_branches:
+            last_inst = block.instructions[-1]
+            target_block = self._find_block_by_address(last_inst.branch_target)
+            if target_block:
+                block.branch_targets.append(target_block.id)
+                edge_src.append(block.index)
+                edge_dst.append(target_block.index)
             else:
-                # Normal fall-through
-                next_block = self._find_next_block(block)
-                if next_block:
-                    block.fall_through = next_block.id
-                    block.successors.add(next_block.id)
-                    next_block.predecessors.add(block_id)
+                # Unresolved branch target
+                self.unresolved.add(last_inst.address)
+                last_inst.annotation = "UNRESOLVED_TARGET"
+        
+        self._install_edges(edge_src, edge_dst)
+    
+    def _install_edges(self, edge_src: array, edge_dst: array):
+        """Group edges by block and fill successor/predecessor sets in bulk"""
+        block_ids = self._block_ids
+        successors: List[List[str]] = [[] for _ in block_ids]
+        predecessors: List[List[str]] = [[] for _ in block_ids]
+        for src, dst in zip(edge_src, edge_dst):
+            successors[src].append(block_ids[dst])
+            predecessors[dst].append(block_ids[src])
         
-        return unresolved_branches
+        # Blocks were inserted in index order
+        for block, succ, pred in zip(self.blocks.values(), successors, predecessors):
+            block.successors.update(succ)
+            block.predecessors.update(pred)
     
     def _assign_synthetic_labels(self):
-        """Assign synthetic labels to branch targets and entry points"""
+        """Assign synthetic labels to branch targets, call targets and entry points"""
         label_counter = 1
         
-        # Label all blocks that are branch targets
-        for block in self.blocks.values():
-            if block.predecessors or block.block_type == BlockType.ENTRY:
-                # This block is a target
-                if block.instructions:
-                    first_inst = block.instructions[0]
-                    if not first_inst.synthetic_label:
-                        # Assign label based on block type
-                        if block.block_type == BlockType.ENTRY:
-                            first_inst.synthetic_label = "ENTRY"
-                        elif block.block_type == BlockType.CALL:
-                            first_inst.synthetic_label = f"PROC_{label_counter:03d}"
-                            label_counter += 1
-                        else:
-                            first_inst.synthetic_label = f"L_{label_counter:05d}"
-                            label_counter += 1
+        # Call targets are always leaders, so each one starts a block
+        call_targets = {inst.branch_target for inst in self.instructions
+                        if inst.is_call and inst.branch_target}
         
-        # Label call targets
-        for inst in self.instructions:
-            if inst.is_call and inst.branch_target:
-                target_inst = self.instruction_map.get(inst.branch_target)
-                if target_inst and not target_inst.synthetic_label:
-                    target_inst.synthetic_label = f"PROC_{label_counter:03d}"
-                    label_counter += 1
-    
-    def _find_unresolved_branches(self, cfg: ControlFlowGraph):
-        """Find branches with unresolved targets"""
-        for inst in self.instructions:
-            if inst.is_branch and inst.branch_target:
-                if inst.branch_target not in self.instruction_map:
-                    cfg.unresolved_branches.append(inst.address)
+        # Label all blocks that are branch or call targets, in address order
+        for block in self.blocks.values():
+            first_inst = block.instructions[0]
+            if first_inst.synthetic_label:
+                continue
+            
+            # Assign label based on block type
+            if block.block_type == BlockType.ENTRY:
+                first_inst.synthetic_label = "ENTRY"
+            elif block.start_address in call_targets or \
+                    (block.predecessors and block.block_type == BlockType.CALL):
+                first_inst.synthetic_label = f"PROC_{label_counter:03d}"
+                label_counter += 1
+            elif block.predecessors:
+                first_inst.synthetic_label = f"L_{label_counter:05d}"
+                label_counter += 1
     
     def _determine_block_type(self, instructions: List[Instruction]) -> BlockType:
         """Determine the type of a basic block"""
@@ -229,53 +253,46 @@ class CFGBuilder:
             
         return BlockType.NORMAL
     
-    def _is_unconditional_branch(self, inst: Instruction) -> bool:
-        """Check if instruction is an unconditional branch"""
-        # BC 15,x is unconditional
-        if inst.mnemonic == "BC" and inst.operands and inst.operands[0] == "15":
-            return True
-        # BCR 15,x is unconditional  
-        if inst.mnemonic == "BCR" and inst.operands and inst.operands[0] == "15":
-            return True
-        # B is always unconditional (extended mnemonic for BC 15)
-        if inst.mnemonic == "B":
-            return True
-        # BR is unconditional
-        if inst.mnemonic == "BR":
-            return True
-        return False
-    
     def _find_block_by_address(self, address: int) -> Optional[BasicBlock]:
         """Find the basic block containing the given address"""
-        for block in self.blocks.values():
-            if block.start_address <= address <= block.end_address:
-                return block
-        return None
-    
-    def _find_next_block(self, block: BasicBlock) -> Optional[BasicBlock]:
-        """Find the next block in address order"""
-        next_addr = None
-        
-        # Find the minimum address greater than this block's end
-        for other_block in self.blocks.values():
-            if other_block.start_address > block.end_address:
-                if next_addr is None or other_block.start_address < next_addr:
-                    next_addr = other_block.start_address
+        cache = self._block_at_addr_cache
+        if address in cache:
+            return cache[address]
         
-        if next_addr:
-            return self._find_block_by_address(next_addr)
-        return None
+        block = None
+        i = bisect_right(self._block_starts, address) - 1
+        if i >= 0:
+            candidate = self.blocks[self._block_ids[i]]
+            if candidate.start_address <= address <= candidate.end_address:
+                block = candidate
+        cache[address] = block
+        return block
 
 
 class ProcedureDetector:
     """Detects procedure boundaries using heuristics"""
     
     def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Clear state from a previous detection so the detector can be reused"""
         self.procedures: Dict[str, Procedure] = {}
         self.proc_counter = 1
+        # Entry address -> first procedure registered at that address
+        self._proc_by_entry: Dict[int, Procedure] = {}
+        # Stamp of the last procedure walk to visit each block, by position in
+        # the CFG's block dict (BasicBlock.index is only set by CFGBuilder)
+        self._visit_marks: List[int] = []
+        self._block_pos: Dict[str, int] = {}
+        self._visit_stamp = 0
         
     def detect_procedures(self, cfg: ControlFlowGraph) -> Dict[str, Procedure]:
         """Detect procedures in the CFG"""
+        self.reset()
+        self._visit_marks = [0] * len(cfg.basic_blocks)
+        self._block_pos = {block_id: i for i, block_id in enumerate(cfg.basic_blocks)}
+        
         # Method 1: Entry points are procedures
         for entry_point in cfg.entry_points:
             self._create_procedure_from_entry(entry_point, cfg)
@@ -310,10 +327,9 @@ class ProcedureDetector:
         )
         
         # Find all blocks in this procedure (simplified - just connected blocks)
-        visited = set()
-        self._collect_procedure_blocks(block, proc, cfg, visited)
+        self._collect_procedure_blocks(block, proc, cfg)
         
-        self.procedures[proc_id] = proc
+        self._register_procedure(proc)
     
     def _detect_call_targets(self, cfg: ControlFlowGraph):
         """Detect procedures from call instructions"""
@@ -335,9 +351,8 @@ class ProcedureDetector:
                                 confidence=Confidence.HIGH
                             )
                             
-                            visited = set()
-                            self._collect_procedure_blocks(target_block, proc, cfg, visited)
-                            self.procedures[proc_id] = proc
+                            self._collect_procedure_blocks(target_block, proc, cfg)
+                            self._register_procedure(proc)
     
     def _detect_prologues(self, cfg: ControlFlowGraph):
         """Detect procedures by prologue patterns"""
@@ -359,31 +374,45 @@ class ProcedureDetector:
                             confidence=Confidence.MEDIUM
                         )
                         
-                        visited = set()
-                        self._collect_procedure_blocks(block, proc, cfg, visited)
-                        self.procedures[proc_id] = proc
+                        self._collect_procedure_blocks(block, proc, cfg)
+                        self._register_procedure(proc)
     
     def _collect_procedure_blocks(self, start_block: BasicBlock, proc: Procedure, 
-                                 cfg: ControlFlowGraph, visited: Set[str]):
-        """Collect all blocks belonging to a procedure"""
-        if start_block.id in visited:
-            return
-            
-        visited.add(start_block.id)
-        proc.basic_blocks.append(start_block.id)
+                                 cfg: ControlFlowGraph):
+        """Collect all blocks belonging to a procedure
         
-        # Check for return instruction
-        if start_block.instructions:
-            last_inst = start_block.instructions[-1]
-            if last_inst.is_return:
-                proc.exit_addresses.append(last_inst.address)
+        Each walk takes a fresh stamp, so the shared visit marks never need
+        clearing between procedures.
+        """
+        self._visit_stamp += 1
+        stamp = self._visit_stamp
+        marks = self._visit_marks
+        pos = self._block_pos
         
-        # Follow successors (but not call targets)
-        for succ_id in start_block.successors:
-            if succ_id not in visited:
+        # Iterative depth-first walk; successors are pushed in reverse so blocks
+        # are collected in the same preorder as a recursive traversal
+        stack = [start_block]
+        while stack:
+            block = stack.pop()
+            i = pos[block.id]
+            if marks[i] == stamp:
+                continue
+            
+            marks[i] = stamp
+            proc.basic_blocks.append(block.id)
+            
+            # Check for return instruction
+            if block.instructions:
+                last_inst = block.instructions[-1]
+                if last_inst.is_return:
+                    proc.exit_addresses.append(last_inst.address)
+            
+            # Follow successors (but not call targets)
+            for succ_id in reversed(list(block.successors)):
                 succ_block = cfg.basic_blocks.get(succ_id)
-                if succ_block and not self._is_call_edge(start_block, succ_block):
-                    self._collect_procedure_blocks(succ_block, proc, cfg, visited)
+                if succ_block and marks[pos[succ_id]] != stamp and \
+                        not self._is_call_edge(block, succ_block):
+                    stack.append(succ_block)
     
     def _build_call_graph(self, cfg: ControlFlowGraph):
         """Build call relationships between procedures"""
@@ -406,24 +435,20 @@ class ProcedureDetector:
     
     def _find_block_by_address(self, address: int, cfg: ControlFlowGraph) -> Optional[BasicBlock]:
         """Find block containing address"""
-        for block in cfg.basic_blocks.values():
-            if block.start_address <= address <= block.end_address:
-                return block
-        return None
+        return cfg.block_containing(address)
+    
+    def _register_procedure(self, proc: Procedure):
+        """Add a procedure and index it by entry address"""
+        self.procedures[proc.id] = proc
+        self._proc_by_entry.setdefault(proc.entry_address, proc)
     
     def _address_in_procedures(self, address: int) -> bool:
         """Check if address is already in a procedure"""
-        for proc in self.procedures.values():
-            if proc.entry_address == address:
-                return True
-        return False
+        return address in self._proc_by_entry
     
     def _find_procedure_by_address(self, address: int) -> Optional[Procedure]:
         """Find procedure by entry address"""
-        for proc in self.procedures.values():
-            if proc.entry_address == address:
-                return proc
-        return None
+        return self._proc_by_entry.get(address)
     
     def _is_call_edge(self, from_block: BasicBlock, to_block: BasicBlock) -> bool:
         """Check if edge is a call edge"""
@@ -1,10 +1,13 @@
 """Region classifier - identifies code vs data vs unknown regions"""
 
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 from typing import List, Tuple
 from enum import Enum
 import logging
 
-from .ir import Instruction, Confidence
+from .ir import Instruction, Confidence, hex_addr
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +22,8 @@ class RegionType(Enum):
 class Region:
     """Classified region in binary"""
     
+    __slots__ = ('start_addr', 'end_addr', 'region_type', 'confidence', 'evidence', 'decode_rate')
+    
     def __init__(self, start_addr: int, end_addr: int, 
                  region_type: RegionType, confidence: Confidence,
                  evidence: str = ""):
@@ -31,8 +36,8 @@ class Region:
         
     def to_dict(self):
         return {
-            "start": f"0x{self.start_addr:08X}",
-            "end": f"0x{self.end_addr:08X}",
+            "start": hex_addr(self.start_addr),
+            "end": hex_addr(self.end_addr),
             "type": self.region_type.value,
             "confidence": self.confidence.value,
             "evidence": self.evidence,
@@ -50,6 +55,10 @@ class RegionClassifier:
     
     def __init__(self):
         self.regions: List[Region] = []
+        # Sorted instruction addresses with prefix sums of decoded bytes,
+        # so any address range is counted in O(log N)
+        self._addrs = array('q')
+        self._decoded_prefix: List[int] = [0]
         
     def classify(self, sections: List[Tuple[int, int, bytes]], 
                  instructions: List[Instruction]) -> List[Region]:
@@ -60,11 +69,15 @@ class RegionClassifier:
         """
         self.regions = []
         
-        # Build instruction address map for quick lookup
-        inst_map = {inst.address: inst for inst in instructions}
+        # Sort instructions once so each section is located by binary search
+        insts_sorted = sorted(instructions, key=lambda i: i.address)
+        self._addrs = array('q', [inst.address for inst in insts_sorted])
+        self._decoded_prefix = [0, *accumulate(
+            len(inst.raw_bytes) if inst.mnemonic != "UNKNOWN" else 0 for inst in insts_sorted
+        )]
         
         for start_addr, end_addr, data in sections:
-            region = self._classify_section(start_addr, end_addr, data, inst_map)
+            region = self._classify_section(start_addr, end_addr, data)
             self.regions.append(region)
             
         # Post-process: check for constant pool patterns
@@ -72,54 +85,76 @@ class RegionClassifier:
         
         return self.regions
     
-    def _classify_section(self, start_addr: int, end_addr: int, 
-                          data: bytes, inst_map: dict) -> Region:
+    def _classify_section(self, start_addr: int, end_addr: int, data: bytes) -> Region:
         """Classify a single section based on decode rate"""
         
         section_size = end_addr - start_addr + 1
-        decoded_bytes = 0
-        valid_instructions = 0
-        total_instructions = 0
         
         # Count successfully decoded instructions in this section
-        for addr in range(start_addr, end_addr + 1):
-            if addr in inst_map:
-                inst = inst_map[addr]
-                total_instructions += 1
-                if inst.mnemonic != "UNKNOWN":
-                    valid_instructions += 1
-                    decoded_bytes += len(inst.raw_bytes)
-        
-        # Calculate decode rate
-        decode_rate = decoded_bytes / section_size if section_size > 0 else 0.0
-        
-        # Classify based on thresholds
-        if decode_rate > self.CODE_THRESHOLD:
-            region_type = RegionType.CODE
-            confidence = Confidence.HIGH
-            evidence = f"decode_rate={decode_rate:.2f} > {self.CODE_THRESHOLD}"
-        elif decode_rate < self.DATA_THRESHOLD:
+        total_instructions, decoded_bytes = self._count_range(start_addr, end_addr)
+        
+        if total_instructions == 0:
+            # Nothing decoded in this section - data without needing a rate
+            decode_rate = 0.0
             region_type = RegionType.DATA
             confidence = Confidence.MEDIUM
-            evidence = f"decode_rate={decode_rate:.2f} < {self.DATA_THRESHOLD}"
+            evidence = "no_decoded_instructions"
         else:
-            region_type = RegionType.UNKNOWN
-            confidence = Confidence.LOW
-            evidence = f"decode_rate={decode_rate:.2f} in uncertain range"
+            decode_rate = decoded_bytes / section_size if section_size > 0 else 0.0
+            region_type, confidence, evidence = self._classify_rate(decode_rate)
         
         region = Region(start_addr, end_addr, region_type, confidence, evidence)
         region.decode_rate = decode_rate
         
-        logger.info(f"Classified region 0x{start_addr:08X}-0x{end_addr:08X} as {region_type.value} "
-                   f"(decode_rate={decode_rate:.2f}, confidence={confidence.value})")
+        logger.info("Classified region 0x%08X-0x%08X as %s (decode_rate=%.2f, confidence=%s)",
+                    start_addr, end_addr, region_type.value, decode_rate, confidence.value)
         
         return region
     
+    def _classify_rate(self, decode_rate: float) -> Tuple[RegionType, Confidence, str]:
+        """Classify a decode rate against the MVP thresholds"""
+        code_threshold = self.CODE_THRESHOLD
+        data_threshold = self.DATA_THRESHOLD
+        
+        if decode_rate > code_threshold:
+            region_type = RegionType.CODE
+            confidence = Confidence.HIGH
+            evidence = f"decode_rate={decode_rate:.2f} > {code_threshold}"
+        elif decode_rate < data_threshold:
+            region_type = RegionType.DATA
+            confidence = Confidence.MEDIUM
+            evidence = f"decode_rate={decode_rate:.2f} < {data_threshold}"
+        else:
+            region_type = RegionType.UNKNOWN
+            confidence = Confidence.LOW
+            evidence = f"decode_rate={decode_rate:.2f} in uncertain range"
+        
+        return region_type, confidence, evidence
+    
+    def _count_range(self, start_addr: int, end_addr: int) -> Tuple[int, int]:
+        """Count (total, decoded bytes) for instructions in an inclusive range"""
+        lo = bisect_left(self._addrs, start_addr)
+        hi = bisect_right(self._addrs, end_addr)
+        return (
+            hi - lo,
+            self._decoded_prefix[hi] - self._decoded_prefix[lo],
+        )
+    
     def _detect_constant_pools(self):
         """Detect constant pool patterns and reclassify if needed"""
         
+        # Code regions are never reclassified here, so one sweep finds the
+        # earliest code end and latest code start for every neighbour check
+        code_type = RegionType.CODE
+        unknown_type = RegionType.UNKNOWN
+        code_regions = [r for r in self.regions if r.region_type is code_type]
+        if not code_regions:
+            return
+        first_code_end = min(r.end_addr for r in code_regions)
+        last_code_start = max(r.start_addr for r in code_regions)
+        
         for region in self.regions:
-            if region.region_type == RegionType.UNKNOWN:
+            if region.region_type is unknown_type:
                 # Check for constant pool indicators:
                 # - Repeated addresses (pointers)
                 # - Alignment patterns
@@ -130,49 +165,51 @@ class RegionClassifier:
                 region_size = region.end_addr - region.start_addr + 1
                 if region_size < 256:  # Small region
                     # Check if surrounded by code
-                    has_code_before = any(
-                        r.region_type == RegionType.CODE and r.end_addr < region.start_addr
-                        for r in self.regions
-                    )
-                    has_code_after = any(
-                        r.region_type == RegionType.CODE and r.start_addr > region.end_addr
-                        for r in self.regions
-                    )
+                    has_code_before = first_code_end < region.start_addr
+                    has_code_after = last_code_start > region.end_addr
                     
                     if has_code_before and has_code_after:
                         # Likely a constant pool
                         region.region_type = RegionType.DATA
                         region.confidence = Confidence.MEDIUM
                         region.evidence = "constant_pool_pattern (between code regions)"
-                        logger.info(f"Reclassified region 0x{region.start_addr:08X} as constant pool")
+                        logger.info("Reclassified region 0x%08X as constant pool",
+                                    region.start_addr)
     
     def get_code_regions(self) -> List[Region]:
         """Get all regions classified as CODE"""
-        return [r for r in self.regions if r.region_type == RegionType.CODE]
+        region_type = RegionType.CODE
+        return [r for r in self.regions if r.region_type is region_type]
     
     def get_data_regions(self) -> List[Region]:
         """Get all regions classified as DATA"""
-        return [r for r in self.regions if r.region_type == RegionType.DATA]
+        region_type = RegionType.DATA
+        return [r for r in self.regions if r.region_type is region_type]
     
     def get_unknown_regions(self) -> List[Region]:
         """Get all regions classified as UNKNOWN"""
-        return [r for r in self.regions if r.region_type == RegionType.UNKNOWN]
+        region_type = RegionType.UNKNOWN
+        return [r for r in self.regions if r.region_type is region_type]
     
     def get_statistics(self) -> dict:
         """Get classification statistics"""
-        total_bytes = sum(r.end_addr - r.start_addr + 1 for r in self.regions)
-        code_bytes = sum(r.end_addr - r.start_addr + 1 for r in self.regions 
-                        if r.region_type == RegionType.CODE)
-        data_bytes = sum(r.end_addr - r.start_addr + 1 for r in self.regions
-                        if r.region_type == RegionType.DATA)
-        unknown_bytes = sum(r.end_addr - r.start_addr + 1 for r in self.regions
-                           if r.region_type == RegionType.UNKNOWN)
+        # Single pass accumulating region counts and byte totals per type
+        region_counts = {region_type: 0 for region_type in RegionType}
+        region_bytes = {region_type: 0 for region_type in RegionType}
+        for r in self.regions:
+            region_counts[r.region_type] += 1
+            region_bytes[r.region_type] += r.end_addr - r.start_addr + 1
+        
+        total_bytes = sum(region_bytes.values())
+        code_bytes = region_bytes[RegionType.CODE]
+        data_bytes = region_bytes[RegionType.DATA]
+        unknown_bytes = region_bytes[RegionType.UNKNOWN]
         
         return {
             "total_regions": len(self.regions),
-            "code_regions": len(self.get_code_regions()),
-            "data_regions": len(self.get_data_regions()),
-            "unknown_regions": len(self.get_unknown_regions()),
+            "code_regions": region_counts[RegionType.CODE],
+            "data_regions": region_counts[RegionType.DATA],
+            "unknown_regions": region_counts[RegionType.UNKNOWN],
             "total_bytes": total_bytes,
             "code_bytes": code_bytes,
             "data_bytes": data_bytes,
@@ -1,15 +1,18 @@
 """Command-line interface for z/OS reverse engineering tool"""
 
 import click
+import heapq
 import logging
 import sys
+from functools import partial
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict
 import structlog
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
 from rich.table import Table
 
+from .ir import DisassemblyResult, ModuleSummary
 from .pipeline import ReverseEngineeringPipeline
 from .reporter import ReportWriter
 
@@ -52,7 +55,7 @@ def main(verbose: bool, debug: bool):
 @click.option('--output-dir', '-o', type=click.Path(path_type=Path), 
               default='./output', help='Output directory for results')
 @click.option('--format', '-f', multiple=True, 
-              type=click.Choice(['text', 'yaml', 'json', 'asm', 'pseudocode']),
+              type=click.Choice(['text', 'yaml', 'json', 'jsonl', 'asm', 'pseudocode']),
               default=['text', 'yaml', 'asm', 'pseudocode'],
               help='Output formats to generate')
 @click.option('--decoder', type=click.Choice(['native', 'external']),
@@ -122,24 +125,27 @@ def analyze(input_file: Path, output_dir: Path, format: tuple,
               default='./output', help='Output directory for results')
 @click.option('--pattern', '-p', default='*', help='File pattern to match (glob)')
 @click.option('--format', '-f', multiple=True,
-              type=click.Choice(['text', 'yaml', 'json', 'asm', 'pseudocode']),
+              type=click.Choice(['text', 'yaml', 'json', 'jsonl', 'asm', 'pseudocode']),
               default=['yaml', 'asm'],
               help='Output formats to generate')
 @click.option('--decoder', type=click.Choice(['native', 'external']),
               default='native', help='Decoder to use')
 @click.option('--max-files', type=int, help='Maximum number of files to process')
+@click.option('--jobs', '-j', type=click.IntRange(min=0), default=1, show_default=True,
+              help='Worker processes (0 = one per CPU)')
 def batch(input_dir: Path, output_dir: Path, pattern: str, format: tuple,
-          decoder: str, max_files: Optional[int]):
+          decoder: str, max_files: Optional[int], jobs: int):
     """Process multiple z/OS binary files in batch"""
     
     console.print(f"[bold blue]Batch processing:[/bold blue] {input_dir}")
     console.print(f"[bold blue]Pattern:[/bold blue] {pattern}")
     console.print(f"[bold blue]Output to:[/bold blue] {output_dir}")
     
-    # Find files - sort lexicographically for determinism (Technical Design §12.6)
-    files = sorted(input_dir.glob(pattern))  # Deterministic ordering
-    if max_files:
-        files = files[:max_files]
+    # Find files - sort lexicographically for determinism (Technical Design §12.6).
+    # With --max-files only the first N paths in sorted order are kept while
+    # streaming the glob, rather than sorting and slicing the full listing.
+    matches = input_dir.glob(pattern)
+    files = heapq.nsmallest(max_files, matches) if max_files else sorted(matches)
     
     if not files:
         console.print(f"[yellow]No files found matching pattern: {pattern}[/yellow]")
@@ -147,45 +153,51 @@ def batch(input_dir: Path, output_dir: Path, pattern: str, format: tuple,
     
     console.print(f"[bold]Found {len(files)} files to process[/bold]")
     
-    # Create pipeline
-    pipeline = ReverseEngineeringPipeline(decoder_type=decoder)
+    # Each module's reports go to a subdirectory named after its stem, so
+    # files sharing a stem would overwrite each other's output
+    by_stem: Dict[str, List[Path]] = {}
+    for file_path in files:
+        by_stem.setdefault(file_path.stem, []).append(file_path)
+    duplicates = [paths for paths in by_stem.values() if len(paths) > 1]
+    if duplicates:
+        console.print("[bold red]✗ Files with the same name would share an output directory:[/bold red]")
+        for paths in duplicates:
+            console.print("  - " + ", ".join(str(p) for p in paths))
+        sys.exit(2)  # FAILURE
+    
     writer = ReportWriter(output_dir)
+    pipeline = ReverseEngineeringPipeline(decoder_type=decoder)
     
     results = {}
     failed = []
     
-    # Process each file
+    # Process each file (no progress rendering when output is piped or logged)
     with Progress(
         TextColumn("[progress.description]{task.description}"),
         BarColumn(),
         "[progress.percentage]{task.percentage:>3.0f}%",
         TimeElapsedColumn(),
-        console=console
+        console=console,
+        disable=not console.is_terminal
     ) as progress:
         task = progress.add_task("Processing files...", total=len(files))
         
-        for file_path in files:  # Already sorted lexicographically
-            progress.update(task, description=f"Processing {file_path.name}...")
-            
-            try:
-                result = pipeline.process_file(file_path)
-                if result:
-                    results[file_path.stem] = result
-                    
-                    # Generate reports for this file
-                    subdir = output_dir / file_path.stem
-                    subdir.mkdir(parents=True, exist_ok=True)
-                    writer_individual = ReportWriter(subdir)
-                    writer_individual.write_reports(result, base_name=file_path.stem,
-                                                   formats=list(format))
-                else:
-                    failed.append(file_path)
-                    
-            except Exception as e:
-                logger.error(f"Failed to process {file_path}: {e}")
-                failed.append(file_path)
-            
-            progress.update(task, advance=1)
+        # Files are independent - analyze them in parallel worker processes,
+        # writing each file's reports in the worker that analyzed it
+        outcomes = pipeline.process_many(
+            files, workers=jobs,
+            on_result=partial(_write_batch_reports, writer=writer, formats=list(format)),
+            progress_callback=lambda path: progress.update(
+                task, description=f"Processed {path.name}", advance=1)
+        )
+    
+    # Collect in input order so the portfolio index stays deterministic
+    for file_path in files:
+        summary = outcomes.get(file_path)
+        if summary and not summary.error:
+            results[file_path.stem] = summary
+        else:
+            failed.append(file_path)
     
     # Write portfolio index
     if results:
@@ -205,6 +217,22 @@ def batch(input_dir: Path, output_dir: Path, pattern: str, format: tuple,
     console.print(f"\n[bold green]✓ Batch processing complete![/bold green]")
 
 
+def _write_batch_reports(file_path: Path, result: DisassemblyResult, writer: ReportWriter,
+                         formats: List[str]) -> ModuleSummary:
+    """Write one batch file's reports into its own subdirectory (runs in worker processes)
+    
+    Only the summary goes back to the parent, not the full result.
+    """
+    summary = ModuleSummary.from_result(file_path.stem, result)
+    try:
+        writer.write_reports(result, base_name=file_path.stem, formats=formats,
+                             output_dir=writer.output_dir / file_path.stem)
+    except Exception as e:
+        logger.error(f"Failed to write reports for {file_path}: {e}")
+        summary.error = str(e)
+    return summary
+
+
 @main.command()
 def info():
     """Display tool information and capabilities"""
@@ -222,7 +250,7 @@ def info():
         ("Procedure Detection", "✓", "Heuristic-based procedure inference"),
         ("Assembler Reconstruction", "✓", "HLASM-like output with synthetic labels"),
         ("Pseudocode Generation", "✓", "Structured control flow representation"),
-        ("Multi-format Output", "✓", "Text, YAML, JSON, ASM, Pseudocode"),
+        ("Multi-format Output", "✓", "Text, YAML, JSON, JSONL, ASM, Pseudocode"),
         ("Batch Processing", "✓", "Portfolio analysis support"),
         ("External Decoder", "Partial", "Interface available, implementation pending"),
         ("LE Detection", "Future", "Language Environment conformance"),
@@ -290,10 +318,14 @@ def _display_batch_summary(results, failed):
     table.add_column("Metric", style="cyan")
     table.add_column("Value", justify="right")
     
-    total_instructions = sum(r.statistics.get('instruction_count', 0) for r in results.values())
-    total_procedures = sum(len(r.cfg.procedures) for r in results.values())
-    avg_decode_rate = (sum(r.statistics.get('decode_rate', 0) for r in results.values()) / 
-                      len(results)) if results else 0
+    total_instructions = 0
+    total_procedures = 0
+    total_decode_rate = 0
+    for summary in results.values():
+        total_instructions += summary.instruction_count
+        total_procedures += summary.procedure_count
+        total_decode_rate += summary.decode_rate
+    avg_decode_rate = total_decode_rate / len(results) if results else 0
     
     table.add_row("Modules Processed", str(len(results)))
     table.add_row("Failed", str(len(failed)))
@@ -1,6 +1,7 @@
 """Disassembler interface with pluggable decoder for z/Architecture instructions"""
 
 from abc import ABC, abstractmethod
+from collections import Counter
 from typing import List, Optional, Tuple, Dict, Any
 from dataclasses import dataclass
 import struct
@@ -10,6 +11,91 @@ from .ir import Instruction, InstructionFormat, DisassemblyResult, ModuleMetadat
 
 logger = logging.getLogger(__name__)
 
+# Precompiled field unpackers and register operand strings for the decode path
+_U32 = struct.Struct('>I')
+_S32 = struct.Struct('>i')
+_REGISTERS = tuple(str(r) for r in range(16))
+
+
+def _opcode_bitmap(mnemonics: Dict[int, str], names: frozenset) -> int:
+    """Build a 256-bit map with bit N set when opcode N decodes to one of names"""
+    return sum(1 << opcode for opcode, mnemonic in mnemonics.items() if mnemonic in names)
+
+
+# Operand decoders per instruction format, dispatched by length and opcode
+
+def _decode_rr(inst_bytes: bytes) -> Tuple[List[str], InstructionFormat]:
+    """RR format: opcode(1) R1R2(1)"""
+    return [_REGISTERS[inst_bytes[1] >> 4], _REGISTERS[inst_bytes[1] & 0xF]], InstructionFormat.RR
+
+
+def _decode_si(inst_bytes: bytes) -> Tuple[List[str], InstructionFormat]:
+    """SI format: opcode(1) I2(1) B1D1(2)"""
+    b1 = (inst_bytes[2] >> 4) & 0xF
+    d1 = ((inst_bytes[2] & 0xF) << 8) | inst_bytes[3]
+    return [f"X'{inst_bytes[1]:02X}'", f"{d1}({b1})"], InstructionFormat.SI
+
+
+def _decode_rs(inst_bytes: bytes) -> Tuple[List[str], InstructionFormat]:
+    """RS format: opcode(1) R1R3(1) B2D2(2)"""
+    b2 = (inst_bytes[2] >> 4) & 0xF
+    d2 = ((inst_bytes[2] & 0xF) << 8) | inst_bytes[3]
+    return ([_REGISTERS[inst_bytes[1] >> 4], _REGISTERS[inst_bytes[1] & 0xF], f"{d2}({b2})"],
+            InstructionFormat.RS)
+
+
+def _decode_rx(inst_bytes: bytes) -> Tuple[List[str], InstructionFormat]:
+    """RX format: opcode(1) R1X2(1) B2D2(2)"""
+    r1 = _REGISTERS[inst_bytes[1] >> 4]
+    x2 = inst_bytes[1] & 0xF
+    b2 = (inst_bytes[2] >> 4) & 0xF
+    d2 = ((inst_bytes[2] & 0xF) << 8) | inst_bytes[3]
+    if x2 != 0:
+        return [r1, f"{d2}({x2},{b2})"], InstructionFormat.RX
+    return [r1, f"{d2}({b2})"], InstructionFormat.RX
+
+
+def _decode_ss(inst_bytes: bytes) -> Tuple[List[str], InstructionFormat]:
+    """SS format: opcode(1) L(1) B1D1(2) B2D2(2)"""
+    b1 = (inst_bytes[2] >> 4) & 0xF
+    d1 = ((inst_bytes[2] & 0xF) << 8) | inst_bytes[3]
+    b2 = (inst_bytes[4] >> 4) & 0xF
+    d2 = ((inst_bytes[4] & 0xF) << 8) | inst_bytes[5]
+    return [f"{d1}({inst_bytes[1]},{b1})", f"{d2}({b2})"], InstructionFormat.SS
+
+
+def _decode_ril(inst_bytes: bytes) -> Tuple[List[str], InstructionFormat]:
+    """RIL format: opcode(2) R1(1) I2(4)"""
+    i2 = _U32.unpack_from(inst_bytes, 2)[0]
+    return [_REGISTERS[inst_bytes[1] >> 4], f"X'{i2:08X}'"], InstructionFormat.RIL
+
+
+def _decode_unknown(inst_bytes: bytes) -> Tuple[List[str], InstructionFormat]:
+    """Extended formats without operand decoding yet"""
+    return [], InstructionFormat.UNKNOWN
+
+
+def _build_decoder_table(default, overrides: Dict[Tuple[int, ...], Any]) -> list:
+    """Build a 256-entry opcode -> decoder table"""
+    table = [default] * 256
+    for opcodes, decoder in overrides.items():
+        for opcode in opcodes:
+            table[opcode] = decoder
+    return table
+
+
+_OPERAND_DECODERS = {
+    2: [_decode_rr] * 256,
+    4: _build_decoder_table(_decode_rx, {
+        tuple(range(0x90, 0x9C)): _decode_si,
+        tuple(range(0x88, 0x90)): _decode_rs,
+    }),
+    6: _build_decoder_table(_decode_unknown, {
+        tuple(range(0xD0, 0xE0)): _decode_ss,
+        (0xC0, 0xC2, 0xC4, 0xC6, 0xC8): _decode_ril,
+    }),
+}
+
 
 class DecoderInterface(ABC):
     """Abstract interface for instruction decoders"""
@@ -59,6 +145,9 @@ class NativeDecoder(DecoderInterface):
         0xE3: 6, 0xE5: 4, 0xEB: 6, 0xEC: 6, 0xED: 6,  # Extended formats
     }
     
+    # Dense 256-entry form of OPCODE_LENGTHS (unlisted opcodes default to 2)
+    LENGTH_TABLE = bytes(map(OPCODE_LENGTHS.get, range(256), [2] * 256))
+    
     # Common instruction mnemonics
     MNEMONICS = {
         0x05: "BALR", 0x0D: "BASR", 0x07: "BCR", 0x47: "BC",
@@ -79,29 +168,51 @@ class NativeDecoder(DecoderInterface):
         0xFB: "SP", 0xF8: "ZAP", 0xF9: "CP", 0xFC: "MP", 0xFD: "DP",
     }
     
+    # Dense 256-entry form of MNEMONICS (unlisted opcodes are UNKNOWN)
+    MNEMONIC_BY_OP = tuple(map(MNEMONICS.get, range(256), ["UNKNOWN"] * 256))
+    
+    # Mnemonic classes used to flag control-flow instructions
+    BRANCH_MNEMONICS = frozenset({"BC", "BCR", "BAL", "BALR", "BASR", "BAS",
+                                  "BXH", "BXLE", "BCT", "BCTR"})
+    CALL_MNEMONICS = frozenset({"BALR", "BASR", "BAL", "BAS"})
+    
+    # The same classes as opcode bitmaps - the mnemonic is a function of the opcode
+    BRANCH_OPCODES = _opcode_bitmap(MNEMONICS, BRANCH_MNEMONICS)
+    CALL_OPCODES = _opcode_bitmap(MNEMONICS, CALL_MNEMONICS)
+    
+    # Bound on memoised byte patterns; oldest entries are evicted first
+    DECODE_CACHE_SIZE = 4096
+    
+    def __init__(self):
+        # Decoded fields keyed by raw instruction bytes - everything except the
+        # address-dependent branch target is a pure function of the bytes
+        self._decode_cache: Dict[bytes, tuple] = {}
+    
     def decode_instruction(self, data: bytes, offset: int, address: int) -> Optional[Instruction]:
         """Decode a single instruction"""
-        if offset >= len(data):
+        data_len = len(data)
+        if offset >= data_len:
             return None
             
-        opcode = data[offset]
-        length = self.get_instruction_length(opcode)
+        # Framing needs only the first byte: one table index per instruction
+        length = self.LENGTH_TABLE[data[offset]]
+        end = offset + length
         
-        if offset + length > len(data):
+        if end > data_len:
             # Not enough bytes for complete instruction
             return None
             
-        inst_bytes = data[offset:offset + length]
-        hex_str = inst_bytes.hex().upper()
+        inst_bytes = data[offset:end]
         
-        # Get mnemonic and decode operands
-        mnemonic, operands, fmt = self._decode_instruction_details(inst_bytes)
-        
-        # Determine instruction type
-        is_branch = mnemonic in ["BC", "BCR", "BAL", "BALR", "BASR", "BAS", "BXH", "BXLE", "BCT", "BCTR"]
-        is_call = mnemonic in ["BALR", "BASR", "BAL", "BAS"]
-        is_return = (mnemonic == "BCR" and operands and operands[0] == "15") or \
-                   (mnemonic == "BR" and operands and operands[0] == "14")
+        cache = self._decode_cache
+        cached = cache.get(inst_bytes)
+        if cached is None:
+            cached = self._decode_fields(inst_bytes)
+            if len(cache) >= self.DECODE_CACHE_SIZE:
+                del cache[next(iter(cache))]
+            cache[inst_bytes] = cached
+        (hex_str, mnemonic, operands, fmt,
+         is_branch, is_call, is_return, is_unconditional) = cached
         
         # Calculate branch target if applicable
         branch_target = None
@@ -113,98 +224,63 @@ class NativeDecoder(DecoderInterface):
             raw_bytes=inst_bytes,
             hex_bytes=hex_str,
             mnemonic=mnemonic,
-            operands=operands,
+            operands=list(operands),
             format=fmt,
             is_branch=is_branch,
             is_call=is_call,
             is_return=is_return,
+            is_unconditional=is_unconditional,
             branch_target=branch_target,
             confidence=Confidence.HIGH if mnemonic != "UNKNOWN" else Confidence.LOW
         )
     
+    def _decode_fields(self, inst_bytes: bytes) -> tuple:
+        """Decode the address-independent fields of an instruction"""
+        hex_str = inst_bytes.hex().upper()
+        
+        # Get mnemonic and decode operands
+        mnemonic, operands, fmt = self._decode_instruction_details(inst_bytes)
+        
+        if mnemonic == "UNKNOWN":
+            # Unrecognised opcodes (typically data) never transfer control;
+            # their operands are still kept for the listing and JSON output
+            return (hex_str, mnemonic, tuple(operands), fmt,
+                    False, False, False, False)
+        
+        # Determine instruction type
+        opcode = inst_bytes[0]
+        is_branch = bool((self.BRANCH_OPCODES >> opcode) & 1)
+        is_call = bool((self.CALL_OPCODES >> opcode) & 1)
+        is_return = bool((mnemonic == "BCR" and operands and operands[0] == "15") or
+                         (mnemonic == "BR" and operands and operands[0] == "14"))
+        # BC/BCR 15,x and the B/BR extended mnemonics always branch
+        is_unconditional = bool(
+            (mnemonic in ("BC", "BCR") and operands and operands[0] == "15")
+            or mnemonic in ("B", "BR")
+        )
+        
+        return (hex_str, mnemonic, tuple(operands), fmt,
+                is_branch, is_call, is_return, is_unconditional)
+    
     def get_instruction_length(self, opcode: int) -> int:
         """Get instruction length based on opcode"""
-        # Check for extended opcodes
-        if opcode in [0xB2, 0xB3, 0xB9]:
-            return 4  # RRE format
-        elif opcode in [0xE3, 0xEB, 0xEC, 0xED]:
-            return 6  # RXY, RSY formats
-        elif opcode in [0xC0, 0xC2, 0xC4, 0xC6, 0xC8]:
-            return 6  # RIL format
-            
-        # Use lookup table
-        return self.OPCODE_LENGTHS.get(opcode, 2)  # Default to 2
+        return self.LENGTH_TABLE[opcode]
     
     def _decode_instruction_details(self, inst_bytes: bytes) -> Tuple[str, List[str], InstructionFormat]:
         """Decode instruction mnemonic and operands"""
         opcode = inst_bytes[0]
-        length = len(inst_bytes)
+        mnemonic = self.MNEMONIC_BY_OP[opcode]
         
-        # Get mnemonic
-        mnemonic = self.MNEMONICS.get(opcode, "UNKNOWN")
-        operands = []
-        fmt = InstructionFormat.UNKNOWN
+        decoders = _OPERAND_DECODERS.get(len(inst_bytes))
+        if decoders is None:
+            return mnemonic, [], InstructionFormat.UNKNOWN
         
-        if length == 2:
-            # RR format: opcode(1) R1R2(1)
-            fmt = InstructionFormat.RR
-            if len(inst_bytes) >= 2:
-                r1 = (inst_bytes[1] >> 4) & 0xF
-                r2 = inst_bytes[1] & 0xF
-                operands = [str(r1), str(r2)]
-                
-        elif length == 4:
-            # Could be RX, RS, or SI format
-            if opcode >= 0x90 and opcode <= 0x9B:
-                # SI format: opcode(1) I2(1) B1D1(2)
-                fmt = InstructionFormat.SI
-                i2 = inst_bytes[1]
-                b1 = (inst_bytes[2] >> 4) & 0xF
-                d1 = ((inst_bytes[2] & 0xF) << 8) | inst_bytes[3]
-                operands = [f"X'{i2:02X}'", f"{d1}({b1})"]
-            elif opcode in [0x88, 0x89, 0x8A, 0x8B, 0x8C, 0x8D, 0x8E, 0x8F]:
-                # RS format: opcode(1) R1R3(1) B2D2(2)
-                fmt = InstructionFormat.RS
-                r1 = (inst_bytes[1] >> 4) & 0xF
-                r3 = inst_bytes[1] & 0xF
-                b2 = (inst_bytes[2] >> 4) & 0xF
-                d2 = ((inst_bytes[2] & 0xF) << 8) | inst_bytes[3]
-                operands = [str(r1), str(r3), f"{d2}({b2})"]
-            else:
-                # RX format: opcode(1) R1X2(1) B2D2(2)
-                fmt = InstructionFormat.RX
-                r1 = (inst_bytes[1] >> 4) & 0xF
-                x2 = inst_bytes[1] & 0xF
-                b2 = (inst_bytes[2] >> 4) & 0xF
-                d2 = ((inst_bytes[2] & 0xF) << 8) | inst_bytes[3]
-                if x2 != 0:
-                    operands = [str(r1), f"{d2}({x2},{b2})"]
-                else:
-                    operands = [str(r1), f"{d2}({b2})"]
-                    
-        elif length == 6:
-            # SS format or extended format
-            if opcode >= 0xD0 and opcode <= 0xDF:
-                # SS format: opcode(1) L(1) B1D1(2) B2D2(2)
-                fmt = InstructionFormat.SS
-                ll = inst_bytes[1]
-                b1 = (inst_bytes[2] >> 4) & 0xF
-                d1 = ((inst_bytes[2] & 0xF) << 8) | inst_bytes[3]
-                b2 = (inst_bytes[4] >> 4) & 0xF
-                d2 = ((inst_bytes[4] & 0xF) << 8) | inst_bytes[5]
-                operands = [f"{d1}({ll},{b1})", f"{d2}({b2})"]
-            elif opcode in [0xC0, 0xC2, 0xC4, 0xC6, 0xC8]:
-                # RIL format: opcode(2) R1(1) I2(4)
-                fmt = InstructionFormat.RIL
-                r1 = (inst_bytes[1] >> 4) & 0xF
-                i2 = struct.unpack('>I', inst_bytes[2:6])[0]
-                operands = [str(r1), f"X'{i2:08X}'"]
-                
+        operands, fmt = decoders[opcode](inst_bytes)
         return mnemonic, operands, fmt
     
     def _calculate_branch_target(self, inst_bytes: bytes, address: int, fmt: InstructionFormat) -> Optional[int]:
         """Calculate branch target address"""
-        if fmt == InstructionFormat.RX and len(inst_bytes) >= 4:
+        if fmt is InstructionFormat.RX and len(inst_bytes) >= 4:
             # RX format branch (e.g., BC)
             b2 = (inst_bytes[2] >> 4) & 0xF
             d2 = ((inst_bytes[2] & 0xF) << 8) | inst_bytes[3]
@@ -213,9 +289,9 @@ class NativeDecoder(DecoderInterface):
                 return d2
             # Else it's base-displacement, cannot resolve without register values
             
-        elif fmt == InstructionFormat.RIL and len(inst_bytes) >= 6:
+        elif fmt is InstructionFormat.RIL and len(inst_bytes) >= 6:
             # RIL format with relative addressing
-            offset = struct.unpack('>i', inst_bytes[2:6])[0]
+            offset = _S32.unpack_from(inst_bytes, 2)[0]
             return address + (offset * 2)  # Halfword addressing
             
         return None
@@ -234,41 +310,60 @@ class Disassembler:
         
     def disassemble(self, data: bytes, base_address: int = 0, metadata: Optional[ModuleMetadata] = None) -> DisassemblyResult:
         """Disassemble binary data into instructions"""
-        self.instructions = []
-        self.unknown_regions = []
+        # Locals avoid attribute lookups in the per-instruction loop
+        instructions: List[Instruction] = []
+        unknown_regions: List[Tuple[int, int, bytes]] = []
+        decode = self.decoder.decode_instruction
+        append_instruction = instructions.append
+        
+        # Statistics are accumulated as instructions are decoded
+        mnemonic_counts: Counter = Counter()
+        decoded_bytes = branch_count = call_count = return_count = 0
         
         offset = 0
+        data_len = len(data)
         current_address = base_address
         unknown_start = None
-        unknown_bytes = b''
+        unknown_offset = 0  # Region bytes are sliced from data once the region closes
         
-        while offset < len(data):
+        while offset < data_len:
             # Try to decode instruction
-            inst = self.decoder.decode_instruction(data, offset, current_address)
+            inst = decode(data, offset, current_address)
             
             if inst:
                 # Successfully decoded
                 if unknown_start is not None:
                     # Save previous unknown region
-                    self.unknown_regions.append((unknown_start, current_address - 1, unknown_bytes))
+                    unknown_regions.append((unknown_start, current_address - 1,
+                                            bytes(data[unknown_offset:offset])))
                     unknown_start = None
-                    unknown_bytes = b''
                     
-                self.instructions.append(inst)
-                offset += len(inst.raw_bytes)
-                current_address += len(inst.raw_bytes)
+                append_instruction(inst)
+                length = len(inst.raw_bytes)
+                offset += length
+                current_address += length
+                
+                decoded_bytes += length
+                mnemonic_counts[inst.mnemonic] += 1
+                branch_count += inst.is_branch
+                call_count += inst.is_call
+                return_count += inst.is_return
             else:
                 # Failed to decode - mark as unknown
                 if unknown_start is None:
                     unknown_start = current_address
+                    unknown_offset = offset
                     
-                unknown_bytes += data[offset:offset + 1]
                 offset += 1
                 current_address += 1
         
         # Handle any remaining unknown region
         if unknown_start is not None:
-            self.unknown_regions.append((unknown_start, current_address - 1, unknown_bytes))
+            unknown_regions.append((unknown_start, current_address - 1,
+                                    bytes(data[unknown_offset:offset])))
+        
+        self.instructions = instructions
+        self.unknown_regions = unknown_regions
         
         # Create CFG (will be populated by CFG builder)
         cfg = ControlFlowGraph(
@@ -277,7 +372,8 @@ class Disassembler:
         )
         
         # Generate statistics
-        stats = self._generate_statistics()
+        stats = self._generate_statistics(decoded_bytes, mnemonic_counts,
+                                          branch_count, call_count, return_count)
         
         return DisassemblyResult(
             metadata=metadata or ModuleMetadata(),
@@ -287,22 +383,19 @@ class Disassembler:
             statistics=stats
         )
     
-    def _generate_statistics(self) -> Dict[str, Any]:
-        """Generate disassembly statistics"""
-        total_bytes = sum(len(inst.raw_bytes) for inst in self.instructions)
+    def _generate_statistics(self, total_bytes: int, mnemonic_counts: Counter,
+                             branch_count: int, call_count: int,
+                             return_count: int) -> Dict[str, Any]:
+        """Generate disassembly statistics from the counts gathered while decoding"""
         unknown_bytes = sum(end - start + 1 for start, end, _ in self.unknown_regions)
         
-        mnemonic_counts = {}
-        for inst in self.instructions:
-            mnemonic_counts[inst.mnemonic] = mnemonic_counts.get(inst.mnemonic, 0) + 1
-            
         return {
             'instruction_count': len(self.instructions),
             'decoded_bytes': total_bytes,
             'unknown_bytes': unknown_bytes,
             'decode_rate': total_bytes / (total_bytes + unknown_bytes) if (total_bytes + unknown_bytes) > 0 else 0,
-            'branch_count': sum(1 for inst in self.instructions if inst.is_branch),
-            'call_count': sum(1 for inst in self.instructions if inst.is_call),
-            'return_count': sum(1 for inst in self.instructions if inst.is_return),
-            'top_mnemonics': sorted(mnemonic_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+            'branch_count': branch_count,
+            'call_count': call_count,
+            'return_count': return_count,
+            'top_mnemonics': mnemonic_counts.most_common(10)
         }
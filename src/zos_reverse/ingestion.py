@@ -1,15 +1,36 @@
 """Binary artifact ingestion for z/OS load modules and program objects"""
 
+import mmap
+import os
+import stat
+import string
 import struct
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, Union
 from dataclasses import dataclass
 import logging
 
-from .ir import ModuleMetadata
+from .ir import DATACLASS_SLOTS, ModuleMetadata
 
 logger = logging.getLogger(__name__)
 
+# Program object header: magic, version, flags, pad, text size, entry offset,
+# external count, section count
+_PROGRAM_OBJECT_HEADER = struct.Struct('>2xHH2xIIHH')
+# Leading offset/size words of a program object section entry
+_SECTION_ENTRY = struct.Struct('>II')
+
+# EBCDIC space, letters A-I/J-R/S-Z (skipping the code-page gaps) and digits
+_PDS_NAME_BYTES = bytes([0x40, *range(0xC1, 0xCA), *range(0xD1, 0xDA),
+                         *range(0xE2, 0xEA), *range(0xF0, 0xFA)])
+
+# EBCDIC (cp037) to ASCII for member and symbol names: letters, digits and
+# spaces map through, anything else becomes '.'
+_NAME_CHARS = frozenset(string.ascii_uppercase + string.digits + ' ')
+_EBCDIC_NAME_TABLE = bytes(
+    ord(c) if c in _NAME_CHARS else ord('.') for c in bytes(range(256)).decode('cp037')
+)
+
 
 class ArtifactFormat:
     """Format detection constants for z/OS binary artifacts"""
@@ -23,7 +44,7 @@ class ArtifactFormat:
     RECFM_U = 0xC0   # Undefined
     
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class LoadModuleHeader:
     """Classic load module header structure"""
     text_length: int
@@ -34,7 +55,7 @@ class LoadModuleHeader:
     rmode: str = "ANY"
 
 
-@dataclass 
+@dataclass(**DATACLASS_SLOTS)
 class ProgramObjectHeader:
     """Program object (binder) header structure"""
     version: int
@@ -49,7 +70,7 @@ class BinaryIngestor:
     """Ingests and identifies z/OS binary artifacts"""
     
     def __init__(self):
-        self.data: bytes = b''
+        self.data: Union[bytes, mmap.mmap] = b''
         self.metadata = ModuleMetadata()
         self.code_start = 0
         self.code_end = 0
@@ -57,9 +78,17 @@ class BinaryIngestor:
     def load_file(self, file_path: Path) -> bool:
         """Load binary file and detect format"""
         try:
+            self.reset()
             with open(file_path, 'rb') as f:
-                self.data = f.read()
-                
+                st = os.fstat(f.fileno())
+                if stat.S_ISREG(st.st_mode) and st.st_size >= 8:
+                    # Map read-only rather than copying: pages are only faulted
+                    # in for the parts of the file that are actually sliced
+                    self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    # Pipes and FIFOs report no size and cannot be mapped
+                    self.data = f.read()
+            
             if len(self.data) < 8:
                 logger.warning(f"File too small: {len(self.data)} bytes")
                 return False
@@ -70,6 +99,7 @@ class BinaryIngestor:
             
         except Exception as e:
             logger.error(f"Failed to load {file_path}: {e}")
+            self.close()
             return False
     
     def _detect_format(self):
@@ -106,7 +136,7 @@ class BinaryIngestor:
         ]
         
         for pattern in entry_patterns:
-            if self.data.startswith(pattern):
+            if self.data[:len(pattern)] == pattern:
                 return True
         
         return False
@@ -147,14 +177,7 @@ class BinaryIngestor:
             return
             
         # Parse basic header (simplified)
-        header = ProgramObjectHeader(
-            version=struct.unpack('>H', self.data[2:4])[0],
-            flags=struct.unpack('>H', self.data[4:6])[0],
-            text_size=struct.unpack('>I', self.data[8:12])[0],
-            entry_offset=struct.unpack('>I', self.data[12:16])[0],
-            external_count=struct.unpack('>H', self.data[16:18])[0],
-            section_count=struct.unpack('>H', self.data[18:20])[0]
-        )
+        header = ProgramObjectHeader(*_PROGRAM_OBJECT_HEADER.unpack_from(self.data, 0))
         
         self.code_start = 32  # After header
         self.code_end = min(self.code_start + header.text_size, len(self.data))
@@ -169,23 +192,20 @@ class BinaryIngestor:
         self.code_start = 0
         self.code_end = len(self.data)
         
-        # Look for likely entry point
-        entry_candidates = []
+        # Look for likely entry point: the first halfword-aligned STM 14,12,x
+        # (common entry) or BALR/BASR (base establishment) in the first 256 bytes
+        limit = min(256, len(self.data) - 2)
+        head = bytes(self.data[:limit + 1])
+        opcodes = head[0:limit:2]  # first byte of each aligned halfword
+        candidates = [2 * k for k in (opcodes.find(b'\x05'), opcodes.find(b'\x0D')) if k != -1]
         
-        # Search for common entry point patterns
-        for i in range(0, min(256, len(self.data) - 2), 2):
-            opcode = self.data[i:i+2]
-            # STM 14,12,x is common entry
-            if opcode == b'\x90\xEC':
-                entry_candidates.append(i)
-            # BALR/BASR for base establishment
-            elif opcode[0] in [0x05, 0x0D]:
-                entry_candidates.append(i)
+        stm = head.find(b'\x90\xEC', 0, limit + 1)
+        while stm != -1 and stm % 2:
+            stm = head.find(b'\x90\xEC', stm + 1, limit + 1)
+        if stm != -1:
+            candidates.append(stm)
         
-        if entry_candidates:
-            self.metadata.entry_point = entry_candidates[0]
-        else:
-            self.metadata.entry_point = 0
+        self.metadata.entry_point = min(candidates, default=0)
             
     def _has_pds_header(self) -> bool:
         """Check if data starts with PDS directory entry"""
@@ -196,11 +216,8 @@ class BinaryIngestor:
         # Check for member name (8 bytes EBCDIC)
         name_bytes = self.data[0:8]
         
-        # Simple check: should be printable EBCDIC or spaces
-        for byte in name_bytes:
-            if byte != 0x40 and not (0xC1 <= byte <= 0xE9):  # EBCDIC letters
-                return False
-        return True
+        # Simple check: should be EBCDIC letters, digits or spaces
+        return not name_bytes.translate(None, _PDS_NAME_BYTES)
     
     def _extract_pds_info(self, header: bytes):
         """Extract info from PDS directory entry"""
@@ -233,9 +250,10 @@ class BinaryIngestor:
         for _ in range(header.section_count):
             if offset + 20 > len(self.data):
                 break
+            section_offset, section_size = _SECTION_ENTRY.unpack_from(self.data, offset)
             section_info = {
-                'offset': struct.unpack('>I', self.data[offset:offset+4])[0],
-                'size': struct.unpack('>I', self.data[offset+4:offset+8])[0],
+                'offset': section_offset,
+                'size': section_size,
                 'type': 'text'  # Simplified
             }
             self.metadata.csect_info.append(section_info)
@@ -243,23 +261,20 @@ class BinaryIngestor:
     
     def _ebcdic_to_ascii(self, ebcdic_bytes: bytes) -> str:
         """Convert EBCDIC to ASCII (simplified)"""
-        # Simplified EBCDIC to ASCII conversion
-        # Full conversion would use proper codec
-        result = []
-        for byte in ebcdic_bytes:
-            if byte == 0x40:  # EBCDIC space
-                result.append(' ')
-            elif 0xC1 <= byte <= 0xC9:  # A-I
-                result.append(chr(ord('A') + byte - 0xC1))
-            elif 0xD1 <= byte <= 0xD9:  # J-R
-                result.append(chr(ord('J') + byte - 0xD1))
-            elif 0xE2 <= byte <= 0xE9:  # S-Z
-                result.append(chr(ord('S') + byte - 0xE2))
-            elif 0xF0 <= byte <= 0xF9:  # 0-9
-                result.append(chr(ord('0') + byte - 0xF0))
-            else:
-                result.append('.')
-        return ''.join(result)
+        return ebcdic_bytes.translate(_EBCDIC_NAME_TABLE).decode('ascii')
+    
+    def reset(self):
+        """Clear state from a previous load so the ingestor can be reused"""
+        self.close()
+        self.metadata = ModuleMetadata()
+        self.code_start = 0
+        self.code_end = 0
+    
+    def close(self):
+        """Release the mapping of the loaded file"""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b''
     
     def get_code_bytes(self) -> bytes:
         """Get the code/text portion of the artifact"""
@@ -1,9 +1,26 @@
 """Intermediate Representation (IR) schemas for z/OS reverse engineering"""
 
+from bisect import bisect_right
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any, Set
+from itertools import chain, compress
+from typing import List, Optional, Dict, Any, Set, Iterable, TextIO
 from enum import Enum
+from functools import lru_cache
 import json
+import sys
+
+# Slotted dataclasses drop the per-instance __dict__ (Python 3.10+)
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+# Address, hex bytes, label, mnemonic, operands
+_ASM_LINE_FORMAT = "%08X %-16s %-8s %-6s %s"
+
+
+@lru_cache(maxsize=1 << 16)
+def hex_addr(address: int) -> str:
+    """Format an address as 0xXXXXXXXX, memoised since the same addresses recur"""
+    return f"0x{address:08X}"
 
 
 class Confidence(Enum):
@@ -40,7 +57,7 @@ class BlockType(Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Instruction:
     """Single disassembled instruction with evidence mapping"""
     address: int
@@ -53,37 +70,34 @@ class Instruction:
     is_branch: bool = False
     is_call: bool = False
     is_return: bool = False
+    is_unconditional: bool = False
     branch_target: Optional[int] = None
     annotation: Optional[str] = None
     confidence: Confidence = Confidence.HIGH
     
     def to_dict(self) -> Dict[str, Any]:
         return {
-            "address": f"0x{self.address:08X}",
+            "address": hex_addr(self.address),
             "bytes": self.hex_bytes,
             "mnemonic": self.mnemonic,
             "operands": self.operands,
             "format": self.format.value,
             "label": self.synthetic_label,
-            "branch_target": f"0x{self.branch_target:08X}" if self.branch_target else None,
+            "branch_target": hex_addr(self.branch_target) if self.branch_target else None,
             "annotation": self.annotation,
-            "confidence": self.confidence.value if isinstance(self.confidence, Confidence) else self.confidence
+            "confidence": getattr(self.confidence, "value", self.confidence)
         }
     
     def to_asm_line(self) -> str:
         """Generate HLASM-like assembly line"""
-        label_str = f"{self.synthetic_label:8}" if self.synthetic_label else " " * 8
-        operands_str = ",".join(self.operands) if self.operands else ""
-        addr_str = f"{self.address:08X}"
-        bytes_str = self.hex_bytes[:16].ljust(16)
-        
-        line = f"{addr_str} {bytes_str} {label_str} {self.mnemonic:6} {operands_str}"
+        line = _ASM_LINE_FORMAT % (self.address, self.hex_bytes[:16], self.synthetic_label or "",
+                                   self.mnemonic, ",".join(self.operands))
         if self.annotation:
-            line += f"  * {self.annotation}"
+            line += "  * " + self.annotation
         return line
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class BasicBlock:
     """Basic block in the control flow graph"""
     id: str
@@ -96,23 +110,24 @@ class BasicBlock:
     fall_through: Optional[str] = None
     branch_targets: List[str] = field(default_factory=list)
     confidence: Confidence = Confidence.HIGH
+    index: int = -1  # Position in address order, assigned by the CFG builder
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             "id": self.id,
-            "start": f"0x{self.start_address:08X}",
-            "end": f"0x{self.end_address:08X}",
+            "start": hex_addr(self.start_address),
+            "end": hex_addr(self.end_address),
             "type": self.block_type.value,
             "instructions": len(self.instructions),
             "predecessors": list(self.predecessors),
             "successors": list(self.successors),
             "fall_through": self.fall_through,
             "branch_targets": self.branch_targets,
-            "confidence": self.confidence.value if isinstance(self.confidence, Confidence) else self.confidence
+            "confidence": getattr(self.confidence, "value", self.confidence)
         }
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Procedure:
     """Inferred procedure/function"""
     id: str
@@ -129,8 +144,8 @@ class Procedure:
         return {
             "id": self.id,
             "name": self.name,
-            "entry": f"0x{self.entry_address:08X}",
-            "exits": [f"0x{addr:08X}" for addr in self.exit_addresses],
+            "entry": hex_addr(self.entry_address),
+            "exits": [hex_addr(addr) for addr in self.exit_addresses],
             "blocks": self.basic_blocks,
             "calls_to": list(self.calls_to),
             "called_by": list(self.called_by),
@@ -139,7 +154,7 @@ class Procedure:
         }
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ControlFlowGraph:
     """Control flow graph for a module"""
     module_name: str
@@ -149,28 +164,96 @@ class ControlFlowGraph:
     call_graph: Dict[str, Set[str]] = field(default_factory=dict)
     unresolved_branches: List[int] = field(default_factory=list)
     data_regions: List[tuple[int, int]] = field(default_factory=list)
+    # (blocks dict, size, sorted starts, sorted blocks) for block_containing
+    _block_index: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    # Bumped by add_block/add_edge so derived results (e.g. reachability) can be cached
+    _version: int = field(default=0, init=False, repr=False, compare=False)
+    # (blocks dict, stamp, reachable ids) memoised by reachable_blocks
+    _reachable: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
     
     def add_block(self, block: BasicBlock):
         self.basic_blocks[block.id] = block
+        self._block_index = None
+        self._version += 1
+    
+    def block_containing(self, address: int) -> Optional[BasicBlock]:
+        """Find the block whose address range contains address, by binary search"""
+        blocks = self.basic_blocks
+        index = self._block_index
+        # Rebuild if blocks were added or the dict was replaced wholesale
+        if index is None or index[0] is not blocks or index[1] != len(blocks):
+            ordered = sorted(blocks.values(), key=lambda b: b.start_address)
+            index = (blocks, len(blocks), [b.start_address for b in ordered], ordered)
+            self._block_index = index
+        
+        i = bisect_right(index[2], address) - 1
+        if i >= 0:
+            block = index[3][i]
+            if block.start_address <= address <= block.end_address:
+                return block
+        return None
+    
+    def reachable_blocks(self) -> Set[str]:
+        """Ids of blocks reachable from the entry points, memoised until the graph changes"""
+        # The builder replaces the blocks dict wholesale, so key on its identity and
+        # size as well as the mutation counter bumped by add_block/add_edge
+        block_map = self.basic_blocks
+        stamp = (len(block_map), self._version, tuple(self.entry_points))
+        cached = self._reachable
+        if cached is not None and cached[0] is block_map and cached[1] == stamp:
+            return cached[2]
+        
+        # Walk block indices with a visited bytearray; ids are only needed
+        # to resolve successors and to build the returned set
+        block_ids = list(block_map)
+        blocks = list(block_map.values())
+        index_of = {block_id: i for i, block_id in enumerate(block_ids)}
+        visited = bytearray(len(block_ids))
+        dangling = set()  # successor ids with no block still count as reached
+        
+        # Start from entry points
+        to_visit = []
+        for entry in self.entry_points:
+            block = self.block_containing(entry)
+            if block:
+                to_visit.append(index_of[block.id])
+        
+        # Depth-first traversal; visiting order does not affect the result
+        while to_visit:
+            i = to_visit.pop()
+            if visited[i]:
+                continue
+            visited[i] = 1
+            for succ_id in blocks[i].successors:
+                j = index_of.get(succ_id)
+                if j is None:
+                    dangling.add(succ_id)
+                elif not visited[j]:
+                    to_visit.append(j)
+        
+        reachable = set(compress(block_ids, visited)) | dangling
+        self._reachable = (block_map, stamp, reachable)
+        return reachable
     
     def add_edge(self, from_id: str, to_id: str):
         if from_id in self.basic_blocks and to_id in self.basic_blocks:
             self.basic_blocks[from_id].successors.add(to_id)
             self.basic_blocks[to_id].predecessors.add(from_id)
+            self._version += 1
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             "module": self.module_name,
-            "entry_points": [f"0x{ep:08X}" for ep in self.entry_points],
+            "entry_points": [hex_addr(ep) for ep in self.entry_points],
             "blocks": {bid: b.to_dict() for bid, b in self.basic_blocks.items()},
             "procedures": {pid: p.to_dict() for pid, p in self.procedures.items()},
             "call_graph": {k: list(v) for k, v in self.call_graph.items()},
-            "unresolved": [f"0x{addr:08X}" for addr in self.unresolved_branches],
-            "data_regions": [[f"0x{s:08X}", f"0x{e:08X}"] for s, e in self.data_regions]
+            "unresolved": [hex_addr(addr) for addr in self.unresolved_branches],
+            "data_regions": [[hex_addr(s), hex_addr(e)] for s, e in self.data_regions]
         }
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ModuleMetadata:
     """Metadata extracted from load module or program object"""
     name: Optional[str] = None
@@ -186,7 +269,7 @@ class ModuleMetadata:
         return {
             "name": self.name,
             "format": self.format_type,
-            "entry_point": f"0x{self.entry_point:08X}" if self.entry_point else None,
+            "entry_point": hex_addr(self.entry_point) if self.entry_point else None,
             "externals": self.external_symbols,
             "csects": self.csect_info,
             "amode": self.amode,
@@ -195,7 +278,7 @@ class ModuleMetadata:
         }
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class DisassemblyResult:
     """Complete disassembly result for a module"""
     metadata: ModuleMetadata
@@ -204,6 +287,7 @@ class DisassemblyResult:
     unknown_regions: List[tuple[int, int, bytes]]  # start, end, raw_bytes
     warnings: List[str] = field(default_factory=list)
     statistics: Dict[str, Any] = field(default_factory=dict)
+    regions: List[Any] = field(default_factory=list)  # classifier Regions
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -211,9 +295,81 @@ class DisassemblyResult:
             "instruction_count": len(self.instructions),
             "cfg": self.cfg.to_dict(),
             "unknown_regions": [
-                {"start": f"0x{s:08X}", "end": f"0x{e:08X}", "size": e - s}
+                {"start": hex_addr(s), "end": hex_addr(e), "size": e - s}
                 for s, e, _ in self.unknown_regions
             ],
             "warnings": self.warnings,
             "statistics": self.statistics
         }
+
+
+@dataclass(**DATACLASS_SLOTS)
+class ModuleSummary:
+    """Headline figures for one module, small enough to pass between processes"""
+    name: str
+    format_type: str = "unknown"
+    entry_point: Optional[int] = None
+    instruction_count: int = 0
+    procedure_count: int = 0
+    decode_rate: float = 0.0
+    unknown_bytes: int = 0
+    error: Optional[str] = None
+    
+    @classmethod
+    def from_result(cls, name: str, result: DisassemblyResult) -> "ModuleSummary":
+        stats = result.statistics
+        return cls(
+            name=name,
+            format_type=result.metadata.format_type,
+            entry_point=result.metadata.entry_point,
+            instruction_count=stats.get('instruction_count', 0),
+            procedure_count=len(result.cfg.procedures),
+            decode_rate=stats.get('decode_rate', 0),
+            unknown_bytes=stats.get('unknown_bytes', 0)
+        )
+
+
+def _cfg_fields(cfg: ControlFlowGraph) -> Dict[str, Any]:
+    """Top-level CFG fields; blocks and procedures are encoded one at a time"""
+    return {
+        "module": cfg.module_name,
+        "entry_points": [hex_addr(ep) for ep in cfg.entry_points],
+        "blocks": cfg.basic_blocks,
+        "procedures": cfg.procedures,
+        "call_graph": cfg.call_graph,
+        "unresolved": [hex_addr(addr) for addr in cfg.unresolved_branches],
+        "data_regions": [[hex_addr(s), hex_addr(e)] for s, e in cfg.data_regions]
+    }
+
+
+_IR_ENCODERS = {
+    Instruction: Instruction.to_dict,
+    BasicBlock: BasicBlock.to_dict,
+    Procedure: Procedure.to_dict,
+    ModuleMetadata: ModuleMetadata.to_dict,
+    ControlFlowGraph: _cfg_fields,
+    set: list,
+    frozenset: list,
+}
+
+
+def encode_ir(obj: Any) -> Any:
+    """json ``default`` hook producing the same structure as the to_dict methods
+    
+    Containers are expanded lazily, so the encoder only holds one small dict
+    per IR object at a time instead of a full copy of the graph.
+    """
+    encoder = _IR_ENCODERS.get(type(obj))
+    if encoder is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return encoder(obj)
+
+
+def write_lines(file: TextIO, lines: Iterable[str]) -> None:
+    """Write newline-separated lines without first joining them into one string"""
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    file.write(first)
+    file.writelines(chain.from_iterable(("\n", line) for line in lines))
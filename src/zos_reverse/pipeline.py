@@ -1,8 +1,12 @@
 """Main processing pipeline for z/OS binary reverse engineering"""
 
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Callable, Dict, Any
+from typing import Optional, Callable, Dict, Any, List
 import logging
+import os
 import time
 
 from .ingestion import BinaryIngestor
@@ -13,6 +17,8 @@ from .ir import DisassemblyResult, Confidence
 
 logger = logging.getLogger(__name__)
 
+_EXPECTED_MNEMONICS = frozenset(('L', 'ST', 'LA', 'BC', 'LR'))
+
 
 class ReverseEngineeringPipeline:
     """Main pipeline coordinating all reverse engineering components"""
@@ -32,6 +38,14 @@ class ReverseEngineeringPipeline:
         # MVP: Only native decoder supported
         # External decoder interface preserved for future
         self.decoder = NativeDecoder()
+        
+        # Stage components are reused across files; each resets its own
+        # state at the start of a run
+        self.ingestor = BinaryIngestor()
+        self.disassembler = Disassembler(decoder=self.decoder)
+        self.classifier = RegionClassifier()
+        self.cfg_builder = CFGBuilder()
+        self.proc_detector = ProcedureDetector()
     
     def process_file(self, file_path: Path, 
                     progress_callback: Optional[Callable[[str], None]] = None) -> Optional[DisassemblyResult]:
@@ -52,46 +66,50 @@ class ReverseEngineeringPipeline:
             if progress_callback:
                 progress_callback("Ingesting binary...")
             
-            ingestor = BinaryIngestor()
+            ingestor = self.ingestor
             if not ingestor.load_file(file_path):
                 logger.error(f"Failed to load file: {file_path}")
                 return None
             
-            metadata = ingestor.get_metadata()
-            code_bytes = ingestor.get_code_bytes()
-            ingestion_stats = ingestor.get_statistics()
+            try:
+                metadata = ingestor.get_metadata()
+                code_bytes = ingestor.get_code_bytes()
+                ingestion_stats = ingestor.get_statistics()
+            finally:
+                ingestor.close()
             
-            logger.info(f"Loaded {metadata.format_type} module: {metadata.name}")
-            logger.info(f"Code size: {ingestion_stats['code_size']} bytes")
+            logger.info("Loaded %s module: %s", metadata.format_type, metadata.name)
+            logger.info("Code size: %d bytes", ingestion_stats['code_size'])
             
             # Step 2: Disassembly
             if progress_callback:
                 progress_callback("Disassembling code...")
             
-            disassembler = Disassembler(decoder=self.decoder)
-            disasm_result = disassembler.disassemble(
+            disasm_result = self.disassembler.disassemble(
                 code_bytes,
                 base_address=ingestor.code_start,
                 metadata=metadata
             )
             
-            logger.info(f"Disassembled {len(disasm_result.instructions)} instructions")
-            logger.info(f"Decode rate: {disasm_result.statistics.get('decode_rate', 0):.1%}")
+            decode_rate = disasm_result.statistics.get('decode_rate', 0)
+            logger.info("Disassembled %d instructions", len(disasm_result.instructions))
+            logger.info("Decode rate: %.1f%%", decode_rate * 100)
             
             # Step 3: Region Classification
             if progress_callback:
                 progress_callback("Classifying regions...")
             
-            classifier = RegionClassifier()
+            classifier = self.classifier
             sections = [(ingestor.code_start, ingestor.code_end, code_bytes)]
             regions = classifier.classify(sections, disasm_result.instructions)
             disasm_result.regions = regions
             
             classification_stats = classifier.get_statistics()
-            logger.info(f"Classified {classification_stats['total_regions']} regions: "
-                       f"{classification_stats['code_regions']} code, "
-                       f"{classification_stats['data_regions']} data, "
-                       f"{classification_stats['unknown_regions']} unknown")
+            logger.info("Classified %d regions: %d code, %d data, %d unknown",
+                        classification_stats['total_regions'],
+                        classification_stats['code_regions'],
+                        classification_stats['data_regions'],
+                        classification_stats['unknown_regions'])
             
             # Update unknown regions in result
             for region in classifier.get_unknown_regions():
@@ -103,19 +121,17 @@ class ReverseEngineeringPipeline:
             if progress_callback:
                 progress_callback("Building control flow graph...")
             
-            cfg_builder = CFGBuilder()
-            cfg = cfg_builder.build_cfg(disasm_result)
+            cfg = self.cfg_builder.build_cfg(disasm_result)
             
-            logger.info(f"Built CFG with {len(cfg.basic_blocks)} basic blocks")
+            logger.info("Built CFG with %d basic blocks", len(cfg.basic_blocks))
             
             # Step 4: Procedure Detection
             if progress_callback:
                 progress_callback("Detecting procedures...")
             
-            proc_detector = ProcedureDetector()
-            procedures = proc_detector.detect_procedures(cfg)
+            procedures = self.proc_detector.detect_procedures(cfg)
             
-            logger.info(f"Detected {len(procedures)} procedures")
+            logger.info("Detected %d procedures", len(procedures))
             
             # Add timing statistics
             elapsed_time = time.time() - start_time
@@ -123,9 +139,9 @@ class ReverseEngineeringPipeline:
             disasm_result.statistics['file_path'] = str(file_path)
             
             # Add warnings for low decode rate
-            if disasm_result.statistics.get('decode_rate', 1.0) < 0.5:
+            if decode_rate < 0.5:
                 disasm_result.warnings.append(
-                    f"Low decode rate ({disasm_result.statistics['decode_rate']:.1%}) - "
+                    f"Low decode rate ({decode_rate:.1%}) - "
                     "file may not be a valid z/OS binary or may use unsupported instructions"
                 )
             
@@ -145,6 +161,61 @@ class ReverseEngineeringPipeline:
             logger.exception(f"Pipeline failed for {file_path}: {e}")
             return None
     
+    def process_many(self, file_paths: List[Path],
+                     workers: Optional[int] = 1,
+                     on_result: Optional[Callable[[Path, DisassemblyResult], Any]] = None,
+                     progress_callback: Optional[Callable[[Path], None]] = None
+                     ) -> Dict[Path, Any]:
+        """
+        Process several files, fanning out to worker processes
+        
+        Files are independent, so each worker runs its own pipeline and only
+        the path crosses the process boundary; workers memory-map the file.
+        
+        Args:
+            file_paths: Paths of the binary files
+            workers: Number of worker processes (default: 1 = serial; None or
+                0 = CPU count)
+            on_result: Optional callback run on each result where it was
+                produced; its return value is passed back instead of the
+                result. Must be picklable when running in parallel.
+            progress_callback: Optional callback with each path as it finishes
+            
+        Returns:
+            DisassemblyResult, or on_result's value (None on failure) per path,
+            in input order
+        """
+        workers = workers or os.cpu_count() or 1
+        outcomes: Dict[Path, Any] = {}
+        
+        if workers <= 1 or len(file_paths) <= 1:
+            for path in file_paths:
+                try:
+                    outcomes[path] = _process_path(self, path, on_result)
+                except Exception as e:
+                    logger.error(f"Processing failed for {path}: {e}")
+                    outcomes[path] = None
+                if progress_callback:
+                    progress_callback(path)
+            return outcomes
+        
+        with ProcessPoolExecutor(max_workers=min(workers, len(file_paths))) as executor:
+            futures = {
+                executor.submit(_process_in_worker, path, self.decoder_type, on_result): path
+                for path in file_paths
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    outcomes[path] = future.result()
+                except Exception as e:
+                    logger.error(f"Worker failed for {path}: {e}")
+                    outcomes[path] = None
+                if progress_callback:
+                    progress_callback(path)
+        
+        return {path: outcomes[path] for path in file_paths}
+    
     def validate_result(self, result: DisassemblyResult) -> Dict[str, Any]:
         """
         Validate and score the analysis result
@@ -184,23 +255,16 @@ class ReverseEngineeringPipeline:
         # Check procedure detection
         if cfg.procedures:
             # Count confidence levels
-            confidence_counts = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0}
-            for p in cfg.procedures.values():
-                if p.confidence == Confidence.HIGH:
-                    confidence_counts['HIGH'] += 1
-                elif p.confidence == Confidence.MEDIUM:
-                    confidence_counts['MEDIUM'] += 1
-                else:
-                    confidence_counts['LOW'] += 1
+            confidence_counts = Counter(p.confidence for p in cfg.procedures.values())
             
             # Calculate average confidence score (HIGH=1.0, MEDIUM=0.5, LOW=0.2)
             total_procs = len(cfg.procedures)
-            avg_confidence = (confidence_counts['HIGH'] * 1.0 + 
-                            confidence_counts['MEDIUM'] * 0.5 + 
-                            confidence_counts['LOW'] * 0.2) / total_procs
+            avg_confidence = (confidence_counts[Confidence.HIGH] * 1.0 + 
+                            confidence_counts[Confidence.MEDIUM] * 0.5 + 
+                            confidence_counts[Confidence.LOW] * 0.2) / total_procs
             validation['scores']['procedure_confidence'] = avg_confidence
             
-            if confidence_counts['LOW'] > total_procs / 2:
+            if confidence_counts[Confidence.LOW] > total_procs / 2:
                 validation['issues'].append('Majority of procedures have low confidence')
         
         # Check for common patterns
@@ -208,8 +272,7 @@ class ReverseEngineeringPipeline:
         if 'top_mnemonics' in stats:
             top_mnems = [m for m, _ in stats['top_mnemonics'][:5]]
             # Should see common z/Architecture instructions
-            expected_mnems = ['L', 'ST', 'LA', 'BC', 'LR']
-            found_expected = any(m in expected_mnems for m in top_mnems)
+            found_expected = not _EXPECTED_MNEMONICS.isdisjoint(top_mnems)
             if not found_expected:
                 validation['issues'].append('Unexpected instruction distribution')
         
@@ -217,27 +280,25 @@ class ReverseEngineeringPipeline:
     
     def _calculate_reachability(self, cfg) -> set:
         """Calculate set of reachable blocks from entry points"""
-        reachable = set()
-        to_visit = []
-        
-        # Start from entry points
-        for entry in cfg.entry_points:
-            for block_id, block in cfg.basic_blocks.items():
-                if block.start_address <= entry <= block.end_address:
-                    to_visit.append(block_id)
-                    break
-        
-        # BFS to find all reachable blocks
-        while to_visit:
-            block_id = to_visit.pop(0)
-            if block_id in reachable:
-                continue
-                
-            reachable.add(block_id)
-            block = cfg.basic_blocks.get(block_id)
-            if block:
-                for succ_id in block.successors:
-                    if succ_id not in reachable:
-                        to_visit.append(succ_id)
-        
-        return reachable
+        return cfg.reachable_blocks()
+
+
+def _process_path(pipeline: ReverseEngineeringPipeline, file_path: Path,
+                  on_result: Optional[Callable[[Path, DisassemblyResult], Any]]) -> Any:
+    """Process one file and apply on_result to a successful result"""
+    result = pipeline.process_file(file_path)
+    if result is None or on_result is None:
+        return result
+    return on_result(file_path, result)
+
+
+@lru_cache(maxsize=None)
+def _worker_pipeline(decoder_type: str) -> ReverseEngineeringPipeline:
+    """Pipeline shared by every file a worker process handles"""
+    return ReverseEngineeringPipeline(decoder_type=decoder_type)
+
+
+def _process_in_worker(file_path: Path, decoder_type: str,
+                       on_result: Optional[Callable[[Path, DisassemblyResult], Any]]) -> Any:
+    """Process one file inside a process_many worker"""
+    return _process_path(_worker_pipeline(decoder_type), file_path, on_result)
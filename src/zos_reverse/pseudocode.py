@@ -1,15 +1,77 @@
 """Pseudocode generator - converts CFG to structured pseudocode"""
 
-from typing import List, Dict, Set, Optional, Tuple, Any
+from typing import List, Dict, Set, Optional, Tuple, Any, Callable, TextIO
 from dataclasses import dataclass
 import logging
 
-from .ir import ControlFlowGraph, BasicBlock, Instruction, Procedure, BlockType, Confidence
+from .ir import (
+    ControlFlowGraph, BasicBlock, Instruction, Procedure, BlockType, Confidence,
+    DATACLASS_SLOTS, write_lines
+)
 
 logger = logging.getLogger(__name__)
 
+# Work item kinds for PseudocodeGenerator._generate_block_sequence
+_VISIT = 0      # generate a block and whatever follows it
+_VISIT_NEW = 1  # as _VISIT, but skipped silently if the block was already visited
+_EMIT = 2       # deferred statement such as ELSE, END IF or END LOOP
 
-@dataclass
+_CONFIDENCE_SCORES: Dict[Confidence, float] = {
+    Confidence.HIGH: 0.95,
+    Confidence.MEDIUM: 0.75,
+    Confidence.LOW: 0.3,
+}
+
+# BC/BCR mask operand -> common condition names
+_BRANCH_CONDITIONS: Dict[str, str] = {
+    "15": "always",
+    "8": "equal",
+    "7": "not_equal",
+    "6": "not_equal",
+    "4": "less_than",
+    "2": "greater_than",
+    "11": "less_or_equal",
+    "13": "greater_or_equal",
+    "1": "overflow",
+    "14": "no_overflow",
+}
+
+# Extended branch mnemonics with a fixed condition
+_EXTENDED_BRANCH_CONDITIONS: Dict[str, str] = {
+    "BZ": "zero",
+    "BNZ": "not_zero",
+    "BP": "positive",
+    "BM": "negative",
+}
+
+# Indent strings for the common nesting depths, built once
+_MAX_CACHED_INDENT = 64
+_INDENTS = tuple("  " * level for level in range(_MAX_CACHED_INDENT))
+
+# Mnemonic -> (statement from the first two operands, verb used with fewer operands)
+_STATEMENT_FORMS: Dict[str, Tuple[Callable[[List[str]], str], str]] = {
+    mnemonic: (render, verb)
+    for mnemonics, render, verb in (
+        # Load/Store operations
+        (("L", "LR", "LH", "LG"), lambda op: f"R{op[0]} = LOAD({op[1]})", "LOAD"),
+        (("ST", "STH", "STG", "STM"), lambda op: f"STORE R{op[0]} to {op[1]}", "STORE"),
+        # Arithmetic operations
+        (("A", "AR", "AH", "AG"), lambda op: f"R{op[0]} = R{op[0]} + {op[1]}", "ADD"),
+        (("S", "SR", "SH", "SG"), lambda op: f"R{op[0]} = R{op[0]} - {op[1]}", "SUB"),
+        (("M", "MR", "MH", "MSG"), lambda op: f"R{op[0]} = R{op[0]} * {op[1]}", "MUL"),
+        # Comparison operations
+        (("C", "CR", "CH", "CG", "CL", "CLR"),
+         lambda op: f"COMPARE R{op[0]} with {op[1]}", "COMPARE"),
+        # Move operations
+        (("MVC",), lambda op: f"MOVE {op[1]} to {op[0]}", "MOVE"),
+        # LA - Load Address
+        (("LA",), lambda op: f"R{op[0]} = ADDRESS_OF({op[1]})", "LOAD_ADDRESS"),
+    )
+    for mnemonic in mnemonics
+}
+
+
+@dataclass(**DATACLASS_SLOTS)
 class PseudocodeStatement:
     """Single pseudocode statement with evidence mapping"""
     text: str
@@ -20,10 +82,17 @@ class PseudocodeStatement:
     
     def to_string(self) -> str:
         """Convert to indented string with evidence"""
-        indent = "  " * self.indent_level
-        addr_str = f"[0x{self.address_range[0]:08X}-0x{self.address_range[1]:08X}]"
-        conf_str = f"(conf: {self.confidence})" if isinstance(self.confidence, float) and self.confidence < 0.8 else ""
-        return f"{indent}{self.text}  // {addr_str} {conf_str}".rstrip()
+        level = self.indent_level
+        indent = _INDENTS[level] if level < _MAX_CACHED_INDENT else "  " * level
+        # Most statements cover a single address, so format it only once
+        start, end = self.address_range
+        start_hex = f"0x{start:08X}"
+        end_hex = start_hex if end == start else f"0x{end:08X}"
+        line = f"{indent}{self.text}  // [{start_hex}-{end_hex}]"
+        confidence = self.confidence
+        if isinstance(confidence, float) and confidence < 0.8:
+            line += f" (conf: {confidence})"
+        return line
 
 
 class PseudocodeGenerator:
@@ -34,11 +103,20 @@ class PseudocodeGenerator:
         self.visited_blocks: Set[str] = set()
         self.loop_headers: Set[str] = set()
         self.indent_level = 0
+        self._proc_by_entry: Dict[int, Procedure] = {}
+        
+    def generate(self, cfg: ControlFlowGraph, out: Optional[TextIO] = None) -> Optional[str]:
+        """Generate complete pseudocode for the module
         
-    def generate(self, cfg: ControlFlowGraph) -> str:
-        """Generate complete pseudocode for the module"""
+        If out is given the pseudocode is written to it and None is returned.
+        """
         self.statements = []
         
+        # Call targets resolve to procedures by entry address; the first one wins
+        self._proc_by_entry = {}
+        for proc in cfg.procedures.values():
+            self._proc_by_entry.setdefault(proc.entry_address, proc)
+        
         # Add module header
         self._add_header(cfg)
         
@@ -57,7 +135,11 @@ class PseudocodeGenerator:
                     self._generate_block_sequence(block, cfg, 0)
         
         # Convert statements to string
-        return "\n".join(stmt.to_string() for stmt in self.statements)
+        lines = map(PseudocodeStatement.to_string, self.statements)
+        if out is not None:
+            write_lines(out, lines)
+            return None
+        return "\n".join(lines)
     
     def _add_header(self, cfg: ControlFlowGraph):
         """Add pseudocode header"""
@@ -76,12 +158,9 @@ class PseudocodeGenerator:
                           (proc.entry_address, proc.entry_address), conf_val)
         
         # Find entry block
-        entry_block = None
-        for block_id in proc.basic_blocks:
-            block = cfg.basic_blocks.get(block_id)
-            if block and block.start_address <= proc.entry_address <= block.end_address:
-                entry_block = block
-                break
+        entry_block = cfg.block_containing(proc.entry_address)
+        if entry_block is not None and entry_block.id not in proc.basic_blocks:
+            entry_block = None
         
         if entry_block:
             self.visited_blocks.clear()
@@ -96,19 +175,32 @@ class PseudocodeGenerator:
     
     def _generate_block_sequence(self, block: BasicBlock, cfg: ControlFlowGraph, indent: int):
         """Generate pseudocode for a sequence of blocks"""
-        if block.id in self.visited_blocks:
-            # Already visited - might be a loop back-edge
-            if block.id in self.loop_headers:
-                self._add_statement("CONTINUE to loop_start", 'loop',
-                                  (block.start_address, block.end_address), 0.7)
-            return
-        
+        # Driven by an explicit work stack rather than recursion so deep CFGs cannot
+        # hit the recursion limit; follow-up items are pushed in reverse so they pop
+        # in output order
+        stack = [(_VISIT, block, indent)]
+        while stack:
+            kind, item, indent = stack.pop()
+            if kind == _EMIT:
+                self._add_statement(*item, indent)
+                continue
+            
+            if item.id in self.visited_blocks:
+                # Already visited - might be a loop back-edge
+                if kind == _VISIT and item.id in self.loop_headers:
+                    self._add_statement("CONTINUE to loop_start", 'loop',
+                                      (item.start_address, item.end_address), 0.7)
+                continue
+            
+            stack.extend(reversed(self._generate_block(item, cfg, indent)))
+    
+    def _generate_block(self, block: BasicBlock, cfg: ControlFlowGraph, indent: int) -> List[tuple]:
+        """Generate one unvisited block, returning the work items that follow it"""
         self.visited_blocks.add(block.id)
         
         # Check if this is a loop header
         if block.id in self.loop_headers:
-            self._generate_loop(block, cfg, indent)
-            return
+            return self._generate_loop(block, cfg, indent)
         
         # Generate statements for instructions in block
         self._generate_block_statements(block, indent)
@@ -129,182 +221,132 @@ class PseudocodeGenerator:
                 if block.fall_through:
                     next_block = cfg.basic_blocks.get(block.fall_through)
                     if next_block:
-                        self._generate_block_sequence(next_block, cfg, indent)
+                        return [(_VISIT, next_block, indent)]
                         
             elif last_inst.is_branch:
-                self._generate_branch_structure(block, cfg, indent)
+                return self._generate_branch_structure(block, cfg, indent)
                 
             else:
                 # Normal fall-through
                 if block.fall_through:
                     next_block = cfg.basic_blocks.get(block.fall_through)
                     if next_block:
-                        self._generate_block_sequence(next_block, cfg, indent)
+                        return [(_VISIT, next_block, indent)]
+        
+        return []
     
     def _generate_block_statements(self, block: BasicBlock, indent: int):
         """Generate statements for instructions in a block"""
+        # Hottest producer of statements, so it appends them directly
+        to_statement = self._instruction_to_statement
+        to_float = self._confidence_to_float
+        append = self.statements.append
         for inst in block.instructions:
             # Skip control flow instructions (handled separately)
             if inst.is_branch or inst.is_call or inst.is_return:
                 continue
                 
             # Generate statement based on instruction
-            stmt = self._instruction_to_statement(inst)
-            self._add_statement(stmt, 'sequence',
-                              (inst.address, inst.address), self._confidence_to_float(inst.confidence), indent)
+            address = inst.address
+            append(PseudocodeStatement(to_statement(inst), indent, (address, address),
+                                       to_float(inst.confidence), 'sequence'))
     
-    def _generate_branch_structure(self, block: BasicBlock, cfg: ControlFlowGraph, indent: int):
+    def _generate_branch_structure(self, block: BasicBlock, cfg: ControlFlowGraph,
+                                   indent: int) -> List[tuple]:
         """Generate if/else structure for conditional branch"""
         if not block.instructions:
-            return
+            return []
             
         last_inst = block.instructions[-1]
+        addr_range = (last_inst.address, last_inst.address)
+        follow: List[tuple] = []
         
         # Check if unconditional branch
-        if self._is_unconditional_branch(last_inst):
+        if last_inst.is_unconditional:
             if block.branch_targets:
                 target_id = block.branch_targets[0]
                 target_block = cfg.basic_blocks.get(target_id)
                 if target_block:
-                    self._add_statement("GOTO", 'sequence',
-                                      (last_inst.address, last_inst.address), 0.8)
-                    self._generate_block_sequence(target_block, cfg, indent)
+                    self._add_statement("GOTO", 'sequence', addr_range, 0.8)
+                    follow.append((_VISIT, target_block, indent))
         else:
             # Conditional branch - generate if/else
             condition = self._get_branch_condition(last_inst)
             
-            self._add_statement(f"IF {condition} THEN", 'if',
-                              (last_inst.address, last_inst.address), 0.75, indent)
+            self._add_statement(f"IF {condition} THEN", 'if', addr_range, 0.75, indent)
             
             # True branch (branch target)
             if block.branch_targets:
                 target_id = block.branch_targets[0]
                 target_block = cfg.basic_blocks.get(target_id)
                 if target_block:
-                    self._generate_block_sequence(target_block, cfg, indent + 1)
+                    follow.append((_VISIT, target_block, indent + 1))
             
             # False branch (fall-through)
             if block.fall_through:
-                self._add_statement("ELSE", 'else',
-                                  (last_inst.address, last_inst.address), 0.75, indent)
+                follow.append((_EMIT, ("ELSE", 'else', addr_range, 0.75), indent))
                 fall_block = cfg.basic_blocks.get(block.fall_through)
                 if fall_block:
-                    self._generate_block_sequence(fall_block, cfg, indent + 1)
+                    follow.append((_VISIT, fall_block, indent + 1))
             
-            self._add_statement("END IF", 'if',
-                              (last_inst.address, last_inst.address), 0.75, indent)
+            follow.append((_EMIT, ("END IF", 'if', addr_range, 0.75), indent))
+        
+        return follow
     
-    def _generate_loop(self, header_block: BasicBlock, cfg: ControlFlowGraph, indent: int):
+    def _generate_loop(self, header_block: BasicBlock, cfg: ControlFlowGraph,
+                       indent: int) -> List[tuple]:
         """Generate loop structure"""
-        self._add_statement("LOOP loop_start:", 'loop',
-                          (header_block.start_address, header_block.end_address), 0.7, indent)
+        addr_range = (header_block.start_address, header_block.end_address)
+        self._add_statement("LOOP loop_start:", 'loop', addr_range, 0.7, indent)
         
         # Generate loop body
         self._generate_block_statements(header_block, indent + 1)
         
-        # Follow successors within loop
+        # Follow successors within loop, skipping any visited by an earlier one
+        follow: List[tuple] = []
         for succ_id in header_block.successors:
             if succ_id != header_block.id:  # Avoid immediate self-loop
                 succ_block = cfg.basic_blocks.get(succ_id)
-                if succ_block and succ_block.id not in self.visited_blocks:
-                    self._generate_block_sequence(succ_block, cfg, indent + 1)
+                if succ_block:
+                    follow.append((_VISIT_NEW, succ_block, indent + 1))
         
-        self._add_statement("END LOOP", 'loop',
-                          (header_block.start_address, header_block.end_address), 0.7, indent)
+        follow.append((_EMIT, ("END LOOP", 'loop', addr_range, 0.7), indent))
+        return follow
     
     def _instruction_to_statement(self, inst: Instruction) -> str:
         """Convert instruction to pseudocode statement"""
         mnemonic = inst.mnemonic
         operands = inst.operands
         
-        # Load/Store operations
-        if mnemonic in ["L", "LR", "LH", "LG"]:
-            if len(operands) >= 2:
-                return f"R{operands[0]} = LOAD({operands[1]})"
-            return f"LOAD {', '.join(operands)}"
-            
-        elif mnemonic in ["ST", "STH", "STG", "STM"]:
+        form = _STATEMENT_FORMS.get(mnemonic)
+        if form is not None:
+            render, verb = form
             if len(operands) >= 2:
-                return f"STORE R{operands[0]} to {operands[1]}"
-            return f"STORE {', '.join(operands)}"
-            
-        # Arithmetic operations
-        elif mnemonic in ["A", "AR", "AH", "AG"]:
-            if len(operands) >= 2:
-                return f"R{operands[0]} = R{operands[0]} + {operands[1]}"
-            return f"ADD {', '.join(operands)}"
-            
-        elif mnemonic in ["S", "SR", "SH", "SG"]:
-            if len(operands) >= 2:
-                return f"R{operands[0]} = R{operands[0]} - {operands[1]}"
-            return f"SUB {', '.join(operands)}"
-            
-        elif mnemonic in ["M", "MR", "MH", "MSG"]:
-            if len(operands) >= 2:
-                return f"R{operands[0]} = R{operands[0]} * {operands[1]}"
-            return f"MUL {', '.join(operands)}"
-            
-        # Comparison operations
-        elif mnemonic in ["C", "CR", "CH", "CG", "CL", "CLR"]:
-            if len(operands) >= 2:
-                return f"COMPARE R{operands[0]} with {operands[1]}"
-            return f"COMPARE {', '.join(operands)}"
-            
-        # Move operations
-        elif mnemonic == "MVC":
-            if len(operands) >= 2:
-                return f"MOVE {operands[1]} to {operands[0]}"
-            return f"MOVE {', '.join(operands)}"
-            
-        # LA - Load Address
-        elif mnemonic == "LA":
-            if len(operands) >= 2:
-                return f"R{operands[0]} = ADDRESS_OF({operands[1]})"
-            return f"LOAD_ADDRESS {', '.join(operands)}"
-            
+                return render(operands)
+            return f"{verb} {', '.join(operands)}"
+        
         # Unknown or complex instruction
-        else:
-            if inst.confidence == Confidence.LOW:
-                return f"UNKNOWN: {inst.hex_bytes}"
-            return f"{mnemonic} {', '.join(operands)}"
+        if inst.confidence == Confidence.LOW:
+            return f"UNKNOWN: {inst.hex_bytes}"
+        return f"{mnemonic} {', '.join(operands)}"
     
     def _get_branch_condition(self, inst: Instruction) -> str:
         """Get human-readable branch condition"""
-        if inst.mnemonic in ["BC", "BCR"]:
-            if inst.operands and len(inst.operands) > 0:
+        mnemonic = inst.mnemonic
+        if mnemonic in ("BC", "BCR"):
+            if inst.operands:
                 mask = inst.operands[0]
-                # Common condition codes
-                conditions = {
-                    "15": "always",
-                    "8": "equal",
-                    "7": "not_equal", 
-                    "6": "not_equal",
-                    "4": "less_than",
-                    "2": "greater_than",
-                    "11": "less_or_equal",
-                    "13": "greater_or_equal",
-                    "1": "overflow",
-                    "14": "no_overflow"
-                }
-                return conditions.get(mask, f"condition_mask_{mask}")
-        elif inst.mnemonic == "BZ":
-            return "zero"
-        elif inst.mnemonic == "BNZ":
-            return "not_zero"
-        elif inst.mnemonic == "BP":
-            return "positive"
-        elif inst.mnemonic == "BM":
-            return "negative"
-        
-        return "condition"
+                return _BRANCH_CONDITIONS.get(mask) or f"condition_mask_{mask}"
+            return "condition"
+        return _EXTENDED_BRANCH_CONDITIONS.get(mnemonic, "condition")
     
     def _get_call_target_name(self, inst: Instruction, cfg: ControlFlowGraph) -> str:
         """Get name of call target"""
         if inst.branch_target:
             # Look for procedure at target
-            for proc in cfg.procedures.values():
-                if proc.entry_address == inst.branch_target:
-                    return proc.name
+            proc = self._proc_by_entry.get(inst.branch_target)
+            if proc:
+                return proc.name
             return f"SUB_{inst.branch_target:08X}"
         
         # Register indirect call
@@ -313,49 +355,54 @@ class PseudocodeGenerator:
         
         return "UNKNOWN"
     
-    def _is_unconditional_branch(self, inst: Instruction) -> bool:
-        """Check if instruction is unconditional branch"""
-        if inst.mnemonic == "BC" and inst.operands and inst.operands[0] == "15":
-            return True
-        if inst.mnemonic == "BCR" and inst.operands and inst.operands[0] == "15":
-            return True
-        if inst.mnemonic in ["B", "BR"]:
-            return True
-        return False
-    
     def _find_loop_headers(self, proc: Procedure, cfg: ControlFlowGraph) -> Set[str]:
-        """Find potential loop headers using back edges"""
+        """Find loop headers as targets of back edges in one depth-first pass
+        
+        An edge is a back edge when its target is still on the DFS stack, which
+        unlike comparing addresses does not mistake backward jumps for loops.
+        """
+        basic_blocks = cfg.basic_blocks
+        proc_blocks = set(proc.basic_blocks)
         loop_headers = set()
+        state: Dict[str, int] = {}  # absent: unvisited, 1: on the stack, 2: finished
         
-        for block_id in proc.basic_blocks:
-            block = cfg.basic_blocks.get(block_id)
-            if block:
-                # Check if any successor is a predecessor (back edge)
-                for succ_id in block.successors:
-                    if succ_id in proc.basic_blocks:
-                        succ_block = cfg.basic_blocks.get(succ_id)
-                        if succ_block and succ_block.start_address <= block.start_address:
-                            # This is a back edge
-                            loop_headers.add(succ_id)
+        # Blocks are collected from the entry block first, so it roots the first tree;
+        # later roots pick up any blocks it does not reach. Successor sets are walked
+        # in id (address) order so irreducible loops get the same header every run
+        for root_id in proc.basic_blocks:
+            if root_id in state or root_id not in basic_blocks:
+                continue
+            state[root_id] = 1
+            stack = [(root_id, iter(sorted(basic_blocks[root_id].successors)))]
+            while stack:
+                block_id, successors = stack[-1]
+                for succ_id in successors:
+                    if succ_id not in proc_blocks:
+                        continue
+                    succ_state = state.get(succ_id)
+                    if succ_state is None:
+                        if succ_id in basic_blocks:
+                            state[succ_id] = 1
+                            stack.append((succ_id, iter(sorted(basic_blocks[succ_id].successors))))
+                            break
+                    elif succ_state == 1:
+                        loop_headers.add(succ_id)
+                else:
+                    # Successors exhausted
+                    state[block_id] = 2
+                    stack.pop()
         
         return loop_headers
     
     def _find_block_by_address(self, address: int, cfg: ControlFlowGraph) -> Optional[BasicBlock]:
         """Find block containing address"""
-        for block in cfg.basic_blocks.values():
-            if block.start_address <= address <= block.end_address:
-                return block
-        return None
+        return cfg.block_containing(address)
     
     def _confidence_to_float(self, confidence) -> float:
         """Convert Confidence enum to float value"""
-        if isinstance(confidence, Confidence):
-            if confidence == Confidence.HIGH:
-                return 0.95
-            elif confidence == Confidence.MEDIUM:
-                return 0.75
-            else:  # LOW
-                return 0.3
+        score = _CONFIDENCE_SCORES.get(confidence)
+        if score is not None:
+            return score
         return confidence if isinstance(confidence, float) else 0.5
     
     def _add_statement(self, text: str, stmt_type: str, addr_range: Tuple[int, int],
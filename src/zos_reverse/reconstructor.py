@@ -1,9 +1,13 @@
 """Assembler reconstructor - generates HLASM-like output from disassembly"""
 
-from typing import List, Optional, Dict, Any
+from itertools import chain
+from operator import attrgetter
+from typing import List, Optional, Dict, Any, TextIO
 import logging
 
-from .ir import DisassemblyResult, Instruction, BasicBlock, Procedure, Confidence
+from .ir import (
+    DisassemblyResult, Instruction, BasicBlock, Procedure, Confidence, hex_addr, write_lines
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +20,13 @@ class AssemblerReconstructor:
         self.include_annotations = True
         self.include_confidence = True
         
-    def reconstruct(self, disasm_result: DisassemblyResult) -> str:
-        """Generate reconstructed assembler listing"""
+    def reconstruct(self, disasm_result: DisassemblyResult,
+                    out: Optional[TextIO] = None) -> Optional[str]:
+        """Generate reconstructed assembler listing
+        
+        If out is given the listing is written to it and None is returned,
+        so the whole listing never exists as a single string.
+        """
         self.output_lines = []
         
         # Add header
@@ -41,6 +50,9 @@ class AssemblerReconstructor:
         # Add statistics
         self._add_statistics(disasm_result.statistics)
         
+        if out is not None:
+            write_lines(out, self.output_lines)
+            return None
         return "\n".join(self.output_lines)
     
     def _add_header(self, disasm_result: DisassemblyResult):
@@ -59,7 +71,7 @@ class AssemblerReconstructor:
         """Add metadata information"""
         self.output_lines.extend([
             "* Metadata:",
-            f"*   Entry Point: 0x{metadata.entry_point:08X}" if metadata.entry_point else "*   Entry Point: unknown",
+            f"*   Entry Point: {hex_addr(metadata.entry_point)}" if metadata.entry_point else "*   Entry Point: unknown",
             f"*   AMODE: {metadata.amode}" if metadata.amode else "*   AMODE: unknown",
             f"*   RMODE: {metadata.rmode}" if metadata.rmode else "*   RMODE: unknown",
         ])
@@ -73,24 +85,21 @@ class AssemblerReconstructor:
     
     def _add_procedures_section(self, disasm_result: DisassemblyResult):
         """Add procedures with their instructions"""
-        # Build instruction to procedure mapping
-        inst_to_proc: Dict[int, str] = {}
+        # Addresses of instructions that belong to some procedure
+        basic_blocks = disasm_result.cfg.basic_blocks
+        proc_addresses = set()
         for proc in disasm_result.cfg.procedures.values():
             for block_id in proc.basic_blocks:
-                block = disasm_result.cfg.basic_blocks.get(block_id)
+                block = basic_blocks.get(block_id)
                 if block:
-                    for inst in block.instructions:
-                        inst_to_proc[inst.address] = proc.id
+                    proc_addresses.update(inst.address for inst in block.instructions)
         
         # Output procedures
         for proc in sorted(disasm_result.cfg.procedures.values(), key=lambda p: p.entry_address):
             self._add_procedure(proc, disasm_result)
         
         # Output orphan instructions (not in any procedure)
-        orphans = []
-        for inst in disasm_result.instructions:
-            if inst.address not in inst_to_proc:
-                orphans.append(inst)
+        orphans = [inst for inst in disasm_result.instructions if inst.address not in proc_addresses]
         
         if orphans:
             self.output_lines.extend([
@@ -107,7 +116,7 @@ class AssemblerReconstructor:
             "",
             "*" * 80,
             f"* Procedure: {proc.name}",
-            f"* Entry: 0x{proc.entry_address:08X}",
+            f"* Entry: {hex_addr(proc.entry_address)}",
             f"* Detection: {proc.detection_method} (confidence: {proc.confidence.value})",
         ])
         
@@ -121,19 +130,19 @@ class AssemblerReconstructor:
             ""
         ])
         
-        # Collect all instructions in this procedure
-        proc_instructions = []
+        # Collect all blocks in this procedure
+        proc_blocks = []
         for block_id in proc.basic_blocks:
             block = disasm_result.cfg.basic_blocks.get(block_id)
             if block:
                 # Add block comment
                 if len(proc.basic_blocks) > 1:
                     self.output_lines.append(f"* Basic Block: {block_id} (type: {block.block_type.value})")
-                proc_instructions.extend(block.instructions)
+                proc_blocks.append(block)
         
-        # Sort by address and output
-        proc_instructions.sort(key=lambda i: i.address)
-        self._add_instruction_list(proc_instructions)
+        # Blocks cover disjoint address ranges, so ordering the blocks orders their instructions
+        proc_blocks.sort(key=attrgetter('start_address'))
+        self._add_instruction_list(list(chain.from_iterable(b.instructions for b in proc_blocks)))
     
     def _add_linear_listing(self, instructions: List[Instruction]):
         """Add linear instruction listing"""
@@ -146,29 +155,29 @@ class AssemblerReconstructor:
     
     def _add_instruction_list(self, instructions: List[Instruction]):
         """Add a list of instructions in HLASM format"""
+        append = self.output_lines.append
+        flag_low_confidence = self.include_confidence
+        low = Confidence.LOW
+        low_marker = f"  [conf: {low.value}]"
+        
         for inst in instructions:
-            # Format instruction
-            addr_str = f"{inst.address:08X}"
-            hex_str = inst.hex_bytes[:12].ljust(12)
-            label = inst.synthetic_label or ""
-            mnemonic = inst.mnemonic
+            operands = ",".join(inst.operands)
             
             # Handle UNRESOLVED_TARGET markers (Technical Design §12.5)
-            if inst.annotation and "UNRESOLVED_TARGET" in inst.annotation:
-                if inst.is_branch and not inst.branch_target:
-                    operands = "UNRESOLVED_TARGET"
-                else:
-                    operands = ",".join(inst.operands) if inst.operands else ""
-            else:
-                operands = ",".join(inst.operands) if inst.operands else ""
+            annotation = inst.annotation
+            if annotation and "UNRESOLVED_TARGET" in annotation and \
+                    inst.is_branch and not inst.branch_target:
+                operands = "UNRESOLVED_TARGET"
             
-            line = f"{addr_str} {hex_str} {label} {mnemonic} {operands}"
+            # Format instruction
+            line = (f"{inst.address:08X} {inst.hex_bytes[:12]:<12} "
+                    f"{inst.synthetic_label or ''} {inst.mnemonic} {operands}")
             
             # Add confidence indicator if low
-            if self.include_confidence and inst.confidence == Confidence.LOW:
-                line += f"  [conf: {inst.confidence.value}]"
+            if flag_low_confidence and inst.confidence is low:
+                line += low_marker
             
-            self.output_lines.append(line)
+            append(line)
     
     def _add_unknown_regions(self, unknown_regions: List[tuple]):
         """Add unknown/undecodable regions"""
@@ -184,7 +193,7 @@ class AssemblerReconstructor:
         
         for start, end, data in unknown_regions:
             size = end - start + 1
-            self.output_lines.append(f"* Region: 0x{start:08X} - 0x{end:08X} ({size} bytes)")
+            self.output_lines.append(f"* Region: {hex_addr(start)} - {hex_addr(end)} ({size} bytes)")
             
             # Show first few bytes as hex
             hex_preview = data[:16].hex().upper() if len(data) > 0 else ""
@@ -1,18 +1,62 @@
 """Report writer - generates text, YAML, and JSON output formats"""
 
+from contextlib import contextmanager
 import json
-import yaml
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 import logging
+import os
 from datetime import datetime
 
-from .ir import DisassemblyResult
+from .ir import DisassemblyResult, ModuleSummary, encode_ir, hex_addr
 from .reconstructor import AssemblerReconstructor
 from .pseudocode import PseudocodeGenerator
 
 logger = logging.getLogger(__name__)
 
+# Text report separators
+_SEP80 = "=" * 80 + "\n"
+_SEP40 = "-" * 40 + "\n"
+_BANNER = _SEP80 + "z/OS BINARY REVERSE ENGINEERING REPORT\n" + _SEP80 + "\n"
+
+
+def _dump_yaml(data: Any, stream) -> None:
+    """Dump data as block-style YAML, importing PyYAML on first use
+    
+    Only the YAML report and the portfolio index need PyYAML, and its import
+    is a noticeable share of startup, so other formats don't pay for it.
+    """
+    import yaml
+    
+    # libyaml's emitter when PyYAML was built with it; both produce the same documents
+    dumper = getattr(yaml, 'CDumper', yaml.Dumper)
+    yaml.dump(data, stream, Dumper=dumper, default_flow_style=False, sort_keys=False)
+
+
+@contextmanager
+def _open_replacing(output_file: Path):
+    """Open a sibling temp file for writing that replaces output_file on success
+    
+    Streamed reports are written as they are rendered, so a rendering error
+    would otherwise leave a truncated file behind.
+    """
+    tmp_file = output_file.with_name(output_file.name + '.tmp')
+    try:
+        with open(tmp_file, 'w') as f:
+            yield f
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+
+def _unknown_region_entries(disasm_result: DisassemblyResult) -> List[Dict[str, Any]]:
+    """Unknown regions as listed in the YAML and JSON reports"""
+    return [
+        {'start': hex_addr(s), 'end': hex_addr(e), 'size': e - s + 1}
+        for s, e, _ in disasm_result.unknown_regions
+    ]
+
 
 class ReportWriter:
     """Generates reports in multiple formats"""
@@ -23,8 +67,19 @@ class ReportWriter:
         
     def write_reports(self, disasm_result: DisassemblyResult, 
                      base_name: Optional[str] = None,
-                     formats: Optional[list] = None) -> Dict[str, Path]:
-        """Write reports in specified formats"""
+                     formats: Optional[list] = None,
+                     output_dir: Optional[Path] = None) -> Dict[str, Path]:
+        """Write reports in specified formats
+        
+        output_dir overrides the writer's directory for this call, so one
+        writer can serve every module in a batch.
+        """
+        if output_dir is None:
+            output_dir = self.output_dir
+        else:
+            output_dir = Path(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+        
         if not base_name:
             base_name = disasm_result.metadata.name or "output"
             
@@ -32,201 +87,256 @@ class ReportWriter:
             formats = ['text', 'yaml', 'json']
         
         output_files = {}
+        # One timestamp for the whole report set so the formats agree
+        timestamp = datetime.now().isoformat()
+        # The YAML and JSON reports list unknown regions identically; build that once
+        regions = None
+        if 'yaml' in formats or 'json' in formats:
+            regions = _unknown_region_entries(disasm_result)
         
         if 'text' in formats:
-            output_files['text'] = self._write_text_report(disasm_result, base_name)
+            output_files['text'] = self._write_text_report(disasm_result, base_name, output_dir,
+                                                           timestamp)
             
         if 'yaml' in formats:
-            output_files['yaml'] = self._write_yaml_report(disasm_result, base_name)
+            output_files['yaml'] = self._write_yaml_report(disasm_result, base_name, output_dir,
+                                                           timestamp, regions)
             
         if 'json' in formats:
-            output_files['json'] = self._write_json_report(disasm_result, base_name)
+            output_files['json'] = self._write_json_report(disasm_result, base_name, output_dir,
+                                                           timestamp, regions)
+            
+        if 'jsonl' in formats:
+            output_files['jsonl'] = self._write_jsonl_report(disasm_result, base_name, output_dir,
+                                                             timestamp)
             
         if 'asm' in formats:
-            output_files['asm'] = self._write_asm_listing(disasm_result, base_name)
+            output_files['asm'] = self._write_asm_listing(disasm_result, base_name, output_dir)
             
         if 'pseudocode' in formats:
-            output_files['pseudocode'] = self._write_pseudocode(disasm_result, base_name)
+            output_files['pseudocode'] = self._write_pseudocode(disasm_result, base_name, output_dir)
             
         return output_files
     
-    def _write_text_report(self, disasm_result: DisassemblyResult, base_name: str) -> Path:
+    def _write_text_report(self, disasm_result: DisassemblyResult, base_name: str,
+                           output_dir: Path, timestamp: str) -> Path:
         """Write human-readable text report"""
-        output_file = self.output_dir / f"{base_name}_report.txt"
+        output_file = output_dir / f"{base_name}_report.txt"
+        
+        out = [_BANNER]
+        
+        # Timestamp
+        out.append(f"Generated: {timestamp}\n\n")
+        
+        # Module information
+        out.append("MODULE INFORMATION\n")
+        out.append(_SEP40)
+        metadata = disasm_result.metadata
+        out.append(f"Name: {metadata.name or 'Unknown'}\n")
+        out.append(f"Format: {metadata.format_type}\n")
+        out.append(f"Entry Point: {hex_addr(metadata.entry_point)}\n" if metadata.entry_point else "Entry Point: Unknown\n")
+        out.append(f"AMODE: {metadata.amode}\n" if metadata.amode else "")
+        out.append(f"RMODE: {metadata.rmode}\n" if metadata.rmode else "")
+        
+        if metadata.external_symbols:
+            out.append("\nExternal Symbols:\n")
+            out.extend(f"  - {sym}\n" for sym in metadata.external_symbols)
+        out.append("\n")
+        
+        # Disassembly statistics
+        out.append("DISASSEMBLY STATISTICS\n")
+        out.append(_SEP40)
+        stats = disasm_result.statistics
+        out.append(f"Instructions decoded: {stats.get('instruction_count', 0)}\n")
+        out.append(f"Bytes decoded: {stats.get('decoded_bytes', 0)}\n")
+        out.append(f"Unknown bytes: {stats.get('unknown_bytes', 0)}\n")
+        out.append(f"Decode rate: {stats.get('decode_rate', 0):.1%}\n")
+        out.append(f"Branch instructions: {stats.get('branch_count', 0)}\n")
+        out.append(f"Call instructions: {stats.get('call_count', 0)}\n")
+        out.append(f"Return instructions: {stats.get('return_count', 0)}\n")
+        out.append("\n")
+        
+        # Control flow analysis
+        out.append("CONTROL FLOW ANALYSIS\n")
+        out.append(_SEP40)
+        cfg = disasm_result.cfg
+        out.append(f"Basic blocks: {len(cfg.basic_blocks)}\n")
+        out.append(f"Procedures detected: {len(cfg.procedures)}\n")
+        out.append(f"Unresolved branches: {len(cfg.unresolved_branches)}\n")
+        
+        pid_to_name = {pid: proc.name for pid, proc in cfg.procedures.items()}
+        
+        if cfg.procedures:
+            out.append("\nDetected Procedures:\n")
+            for proc in sorted(cfg.procedures.values(), key=lambda p: p.entry_address):
+                out.append(f"  - {proc.name} @ {hex_addr(proc.entry_address)}")
+                out.append(f" (confidence: {proc.confidence.value}, method: {proc.detection_method})\n")
+                if proc.calls_to:
+                    called_names = [pid_to_name[pid] for pid in proc.calls_to if pid in pid_to_name]
+                    out.append(f"    Calls: {', '.join(called_names)}\n")
+        out.append("\n")
+        
+        # Call graph
+        if cfg.call_graph:
+            out.append("CALL GRAPH\n")
+            out.append(_SEP40)
+            for caller, callees in cfg.call_graph.items():
+                out.append(f"{pid_to_name.get(caller, caller)}:\n")
+                for callee in callees:
+                    out.append(f"  -> {pid_to_name.get(callee, callee)}\n")
+            out.append("\n")
+        
+        # Unknown regions
+        if disasm_result.unknown_regions:
+            out.append("UNKNOWN REGIONS\n")
+            out.append(_SEP40)
+            out.append(f"Total regions: {len(disasm_result.unknown_regions)}\n")
+            total_unknown = sum(end - start + 1 for start, end, _ in disasm_result.unknown_regions)
+            out.append(f"Total bytes: {total_unknown}\n")
+            out.append("\nRegions:\n")
+            for start, end, _ in disasm_result.unknown_regions[:10]:  # First 10
+                out.append(f"  {hex_addr(start)} - {hex_addr(end)} ({end - start + 1} bytes)\n")
+            if len(disasm_result.unknown_regions) > 10:
+                out.append(f"  ... and {len(disasm_result.unknown_regions) - 10} more\n")
+            out.append("\n")
+        
+        # Warnings
+        if disasm_result.warnings:
+            out.append("WARNINGS\n")
+            out.append(_SEP40)
+            out.extend(f"  - {warning}\n" for warning in disasm_result.warnings)
+            out.append("\n")
+        
+        # Top mnemonics
+        if stats.get('top_mnemonics'):
+            out.append("TOP INSTRUCTION MNEMONICS\n")
+            out.append(_SEP40)
+            out.extend(f"  {mnem:10} : {count:5} occurrences\n"
+                       for mnem, count in stats['top_mnemonics'])
         
         with open(output_file, 'w') as f:
-            # Header
-            f.write("=" * 80 + "\n")
-            f.write("z/OS BINARY REVERSE ENGINEERING REPORT\n")
-            f.write("=" * 80 + "\n\n")
-            
-            # Timestamp
-            f.write(f"Generated: {datetime.now().isoformat()}\n\n")
-            
-            # Module information
-            f.write("MODULE INFORMATION\n")
-            f.write("-" * 40 + "\n")
-            metadata = disasm_result.metadata
-            f.write(f"Name: {metadata.name or 'Unknown'}\n")
-            f.write(f"Format: {metadata.format_type}\n")
-            f.write(f"Entry Point: 0x{metadata.entry_point:08X}\n" if metadata.entry_point else "Entry Point: Unknown\n")
-            f.write(f"AMODE: {metadata.amode}\n" if metadata.amode else "")
-            f.write(f"RMODE: {metadata.rmode}\n" if metadata.rmode else "")
-            
-            if metadata.external_symbols:
-                f.write("\nExternal Symbols:\n")
-                for sym in metadata.external_symbols:
-                    f.write(f"  - {sym}\n")
-            f.write("\n")
-            
-            # Disassembly statistics
-            f.write("DISASSEMBLY STATISTICS\n")
-            f.write("-" * 40 + "\n")
-            stats = disasm_result.statistics
-            f.write(f"Instructions decoded: {stats.get('instruction_count', 0)}\n")
-            f.write(f"Bytes decoded: {stats.get('decoded_bytes', 0)}\n")
-            f.write(f"Unknown bytes: {stats.get('unknown_bytes', 0)}\n")
-            f.write(f"Decode rate: {stats.get('decode_rate', 0):.1%}\n")
-            f.write(f"Branch instructions: {stats.get('branch_count', 0)}\n")
-            f.write(f"Call instructions: {stats.get('call_count', 0)}\n")
-            f.write(f"Return instructions: {stats.get('return_count', 0)}\n")
-            f.write("\n")
-            
-            # Control flow analysis
-            f.write("CONTROL FLOW ANALYSIS\n")
-            f.write("-" * 40 + "\n")
-            cfg = disasm_result.cfg
-            f.write(f"Basic blocks: {len(cfg.basic_blocks)}\n")
-            f.write(f"Procedures detected: {len(cfg.procedures)}\n")
-            f.write(f"Unresolved branches: {len(cfg.unresolved_branches)}\n")
-            
-            if cfg.procedures:
-                f.write("\nDetected Procedures:\n")
-                for proc in sorted(cfg.procedures.values(), key=lambda p: p.entry_address):
-                    f.write(f"  - {proc.name} @ 0x{proc.entry_address:08X}")
-                    f.write(f" (confidence: {proc.confidence.value}, method: {proc.detection_method})\n")
-                    if proc.calls_to:
-                        called_names = [cfg.procedures[pid].name for pid in proc.calls_to if pid in cfg.procedures]
-                        f.write(f"    Calls: {', '.join(called_names)}\n")
-            f.write("\n")
-            
-            # Call graph
-            if cfg.call_graph:
-                f.write("CALL GRAPH\n")
-                f.write("-" * 40 + "\n")
-                for caller, callees in cfg.call_graph.items():
-                    caller_name = cfg.procedures[caller].name if caller in cfg.procedures else caller
-                    f.write(f"{caller_name}:\n")
-                    for callee in callees:
-                        callee_name = cfg.procedures[callee].name if callee in cfg.procedures else callee
-                        f.write(f"  -> {callee_name}\n")
-                f.write("\n")
-            
-            # Unknown regions
-            if disasm_result.unknown_regions:
-                f.write("UNKNOWN REGIONS\n")
-                f.write("-" * 40 + "\n")
-                f.write(f"Total regions: {len(disasm_result.unknown_regions)}\n")
-                total_unknown = sum(end - start + 1 for start, end, _ in disasm_result.unknown_regions)
-                f.write(f"Total bytes: {total_unknown}\n")
-                f.write("\nRegions:\n")
-                for start, end, _ in disasm_result.unknown_regions[:10]:  # First 10
-                    f.write(f"  0x{start:08X} - 0x{end:08X} ({end - start + 1} bytes)\n")
-                if len(disasm_result.unknown_regions) > 10:
-                    f.write(f"  ... and {len(disasm_result.unknown_regions) - 10} more\n")
-                f.write("\n")
-            
-            # Warnings
-            if disasm_result.warnings:
-                f.write("WARNINGS\n")
-                f.write("-" * 40 + "\n")
-                for warning in disasm_result.warnings:
-                    f.write(f"  - {warning}\n")
-                f.write("\n")
-            
-            # Top mnemonics
-            if 'top_mnemonics' in stats:
-                f.write("TOP INSTRUCTION MNEMONICS\n")
-                f.write("-" * 40 + "\n")
-                for mnem, count in stats['top_mnemonics']:
-                    f.write(f"  {mnem:10} : {count:5} occurrences\n")
+            f.writelines(out)
         
         logger.info(f"Text report written to {output_file}")
         return output_file
     
-    def _write_yaml_report(self, disasm_result: DisassemblyResult, base_name: str) -> Path:
+    def _write_yaml_report(self, disasm_result: DisassemblyResult, base_name: str,
+                           output_dir: Path, timestamp: str,
+                           regions: List[Dict[str, Any]]) -> Path:
         """Write YAML format report"""
-        output_file = self.output_dir / f"{base_name}_analysis.yaml"
+        output_file = output_dir / f"{base_name}_analysis.yaml"
         
         data = {
             'metadata': disasm_result.metadata.to_dict(),
             'statistics': disasm_result.statistics,
             'cfg': disasm_result.cfg.to_dict(),
-            'unknown_regions': [
-                {'start': f'0x{s:08X}', 'end': f'0x{e:08X}', 'size': e - s + 1}
-                for s, e, _ in disasm_result.unknown_regions
-            ],
+            'unknown_regions': regions,
             'warnings': disasm_result.warnings,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp
         }
         
         with open(output_file, 'w') as f:
-            yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+            _dump_yaml(data, f)
         
         logger.info(f"YAML report written to {output_file}")
         return output_file
     
-    def _write_json_report(self, disasm_result: DisassemblyResult, base_name: str) -> Path:
+    def _write_json_report(self, disasm_result: DisassemblyResult, base_name: str,
+                           output_dir: Path, timestamp: str,
+                           regions: List[Dict[str, Any]]) -> Path:
         """Write JSON format report"""
-        output_file = self.output_dir / f"{base_name}_analysis.json"
+        output_file = output_dir / f"{base_name}_analysis.json"
         
+        # IR objects are left in place and expanded by encode_ir as the
+        # encoder streams them out, rather than building a to_dict() copy
         data = {
-            'metadata': disasm_result.metadata.to_dict(),
+            'metadata': disasm_result.metadata,
             'statistics': disasm_result.statistics,
-            'cfg': disasm_result.cfg.to_dict(),
-            'instructions': [inst.to_dict() for inst in disasm_result.instructions[:1000]],  # Limit for size
-            'unknown_regions': [
-                {'start': f'0x{s:08X}', 'end': f'0x{e:08X}', 'size': e - s + 1}
-                for s, e, _ in disasm_result.unknown_regions
-            ],
+            'cfg': disasm_result.cfg,
+            'instructions': disasm_result.instructions[:1000],  # Limit for size
+            'unknown_regions': regions,
             'warnings': disasm_result.warnings,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp
         }
         
         with open(output_file, 'w') as f:
-            json.dump(data, f, indent=2)
+            json.dump(data, f, indent=2, default=encode_ir)
         
         logger.info(f"JSON report written to {output_file}")
         return output_file
     
-    def _write_asm_listing(self, disasm_result: DisassemblyResult, base_name: str) -> Path:
+    def _write_jsonl_report(self, disasm_result: DisassemblyResult, base_name: str,
+                            output_dir: Path, timestamp: str) -> Path:
+        """Write JSON Lines report, one record per line, without a full in-memory tree
+        
+        Unlike the JSON report, every instruction is included since records are
+        encoded and written one at a time. Record types are module, instruction,
+        block, procedure, call_graph (one per caller), unresolved and
+        unknown_region.
+        """
+        output_file = output_dir / f"{base_name}_analysis.jsonl"
+        cfg = disasm_result.cfg
+        
+        with _open_replacing(output_file) as f:
+            def emit(record: str, data: Dict[str, Any]):
+                f.write(json.dumps({'record': record, **data}))
+                f.write('\n')
+            
+            emit('module', {
+                'metadata': disasm_result.metadata.to_dict(),
+                'statistics': disasm_result.statistics,
+                'warnings': disasm_result.warnings,
+                'timestamp': timestamp
+            })
+            for inst in disasm_result.instructions:
+                emit('instruction', inst.to_dict())
+            for block in cfg.basic_blocks.values():
+                emit('block', block.to_dict())
+            for proc in cfg.procedures.values():
+                emit('procedure', proc.to_dict())
+            for caller, callees in cfg.call_graph.items():
+                emit('call_graph', {'caller': caller, 'callees': list(callees)})
+            for addr in cfg.unresolved_branches:
+                emit('unresolved', {'address': hex_addr(addr)})
+            for s, e, _ in disasm_result.unknown_regions:
+                emit('unknown_region', {'start': hex_addr(s), 'end': hex_addr(e), 'size': e - s + 1})
+        
+        logger.info(f"JSONL report written to {output_file}")
+        return output_file
+    
+    def _write_asm_listing(self, disasm_result: DisassemblyResult, base_name: str,
+                           output_dir: Path) -> Path:
         """Write reconstructed assembly listing"""
-        output_file = self.output_dir / f"{base_name}.asm"
+        output_file = output_dir / f"{base_name}.asm"
         
         reconstructor = AssemblerReconstructor()
-        asm_text = reconstructor.reconstruct(disasm_result)
         
-        with open(output_file, 'w') as f:
-            f.write(asm_text)
+        with _open_replacing(output_file) as f:
+            reconstructor.reconstruct(disasm_result, out=f)
         
         logger.info(f"Assembly listing written to {output_file}")
         return output_file
     
-    def _write_pseudocode(self, disasm_result: DisassemblyResult, base_name: str) -> Path:
+    def _write_pseudocode(self, disasm_result: DisassemblyResult, base_name: str,
+                          output_dir: Path) -> Path:
         """Write pseudocode representation"""
-        output_file = self.output_dir / f"{base_name}_pseudocode.txt"
+        output_file = output_dir / f"{base_name}_pseudocode.txt"
         
         generator = PseudocodeGenerator()
-        pseudocode = generator.generate(disasm_result.cfg)
         
-        with open(output_file, 'w') as f:
-            f.write(pseudocode)
+        with _open_replacing(output_file) as f:
+            generator.generate(disasm_result.cfg, out=f)
         
         logger.info(f"Pseudocode written to {output_file}")
         return output_file
     
-    def write_portfolio_index(self, results: Dict[str, DisassemblyResult]) -> Path:
-        """Write index file for batch processing results"""
+    def write_portfolio_index(self,
+                              results: Dict[str, Union[DisassemblyResult, ModuleSummary]]) -> Path:
+        """Write index file for batch processing results
+        
+        Modules may be given as full results or as the summaries batch
+        workers send back.
+        """
         index_file = self.output_dir / "portfolio_index.yaml"
         
         index_data = {
@@ -238,31 +348,36 @@ class ReportWriter:
         total_instructions = 0
         total_procedures = 0
         total_unknown_bytes = 0
+        total_decode_rate = 0
         
         for name, result in results.items():
-            module_info = {
+            if isinstance(result, DisassemblyResult):
+                result = ModuleSummary.from_result(name, result)
+            entry_point = result.entry_point
+            index_data['modules'].append({
                 'name': name,
-                'format': result.metadata.format_type,
-                'instructions': result.statistics.get('instruction_count', 0),
-                'procedures': len(result.cfg.procedures),
-                'decode_rate': result.statistics.get('decode_rate', 0),
-                'entry_point': f"0x{result.metadata.entry_point:08X}" if result.metadata.entry_point else None
-            }
-            index_data['modules'].append(module_info)
+                'format': result.format_type,
+                'instructions': result.instruction_count,
+                'procedures': result.procedure_count,
+                'decode_rate': result.decode_rate,
+                'entry_point': hex_addr(entry_point) if entry_point else None
+            })
             
-            total_instructions += result.statistics.get('instruction_count', 0)
-            total_procedures += len(result.cfg.procedures)
-            total_unknown_bytes += result.statistics.get('unknown_bytes', 0)
+            total_instructions += result.instruction_count
+            total_procedures += result.procedure_count
+            total_unknown_bytes += result.unknown_bytes
+            total_decode_rate += result.decode_rate
         
         index_data['summary'] = {
             'total_instructions': total_instructions,
             'total_procedures': total_procedures,
             'total_unknown_bytes': total_unknown_bytes,
-            'average_decode_rate': sum(m['decode_rate'] for m in index_data['modules']) / len(results) if results else 0
+            'average_decode_rate': total_decode_rate / len(results) if results else 0
         }
         
         with open(index_file, 'w') as f:
-            yaml.dump(index_data, f, default_flow_style=False, sort_keys=False)
+            _dump_yaml(index_data, f)
         
         logger.info(f"Portfolio index written to {index_file}")
         return index_file
+
@@ -1,14 +1,52 @@
 """Tests for the reverse engineering pipeline"""
 
-import pytest
-from pathlib import Path
-import tempfile
+import io
+import json
+import os
 import struct
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
 
-from zos_reverse.pipeline import ReverseEngineeringPipeline
+import pytest
+import yaml
+
+from zos_reverse.cfg_builder import CFGBuilder, ProcedureDetector
+from zos_reverse.classifier import RegionClassifier, RegionType
+from zos_reverse.disassembler import Disassembler, NativeDecoder
 from zos_reverse.ingestion import BinaryIngestor
-from zos_reverse.disassembler import NativeDecoder
-from zos_reverse.ir import InstructionFormat
+from zos_reverse.ir import (
+    BasicBlock,
+    ControlFlowGraph,
+    DisassemblyResult,
+    Instruction,
+    InstructionFormat,
+    ModuleMetadata,
+    ModuleSummary,
+    encode_ir,
+)
+from zos_reverse.pipeline import ReverseEngineeringPipeline
+from zos_reverse.pseudocode import PseudocodeGenerator
+from zos_reverse.reconstructor import AssemblerReconstructor
+from zos_reverse.reporter import ReportWriter
+
+# BALR 14,15; BC 8,X'08'; LR 1,2; BCR 15,14 - a call, a conditional branch and a return
+BRANCHING_PROGRAM = bytes([0x05, 0xEF, 0x47, 0x80, 0x00, 0x08, 0x18, 0x12, 0x07, 0xFE])
+
+
+@pytest.fixture
+def branching_file(tmp_path):
+    """BRANCHING_PROGRAM written to a module file"""
+    path = tmp_path / "module.bin"
+    path.write_bytes(BRANCHING_PROGRAM)
+    return path
+
+
+def _instruction_count(path, result):
+    """process_many on_result hook; module level so worker processes can unpickle it"""
+    return len(result.instructions)
 
 
 class TestPipeline:
@@ -38,6 +76,43 @@ class TestPipeline:
         assert inst is not None
         assert inst.mnemonic == "BC"
         assert inst.is_branch == True
+        assert inst.is_unconditional
+        
+        # Test BC 8,x - conditional branch
+        data = bytes([0x47, 0x80, 0x10, 0x00])
+        inst = decoder.decode_instruction(data, 0, 0x1000)
+        assert inst is not None
+        assert inst.is_branch
+        assert not inst.is_unconditional
+    
+    def test_decode_cache_is_address_independent(self):
+        """Test repeated byte patterns decode identically at any address"""
+        decoder = NativeDecoder()
+        data = bytes([0x18, 0xF1])  # LR 15,1
+        
+        first = decoder.decode_instruction(data, 0, 0x1000)
+        second = decoder.decode_instruction(data, 0, 0x2000)
+        assert first.address == 0x1000
+        assert second.address == 0x2000
+        assert second.mnemonic == "LR"
+        assert second.operands == ["15", "1"]
+        assert second.operands is not first.operands
+        
+        # The cache stays bounded
+        decoder.DECODE_CACHE_SIZE = 4
+        for r in range(16):
+            decoder.decode_instruction(bytes([0x18, r]), 0, 0)
+        assert len(decoder._decode_cache) == 4
+    
+    def test_asm_line_format(self):
+        """Test listing lines keep fixed column widths"""
+        decoder = NativeDecoder()
+        inst = decoder.decode_instruction(bytes([0x47, 0xF0, 0x10, 0x00]), 0, 0x1000)
+        assert inst.to_asm_line() == "00001000 47F01000                  BC     15,0(1)"
+        
+        inst.synthetic_label = "L0001"
+        inst.annotation = "loop"
+        assert inst.to_asm_line() == "00001000 47F01000         L0001    BC     15,0(1)  * loop"
     
     def test_synthetic_binary(self, tmp_path):
         """Test with a synthetic z/OS-like binary"""
@@ -93,6 +168,78 @@ class TestPipeline:
         # Validate the result
         validation = pipeline.validate_result(result)
         assert validation['is_valid'] == True
+        
+        # Streaming JSON encoding matches the to_dict() tree
+        encoded = json.dumps(result.cfg, default=encode_ir)
+        assert json.loads(encoded) == json.loads(json.dumps(result.cfg.to_dict()))
+    
+    def test_pipeline_reuse_keeps_results_independent(self, tmp_path):
+        """Test that reusing one pipeline does not alter earlier results"""
+        first_file = tmp_path / "first.bin"
+        first_file.write_bytes(BRANCHING_PROGRAM)
+        second_file = tmp_path / "second.bin"
+        second_file.write_bytes(bytes([0x90, 0xEC, 0xD0, 0x0C, 0x07, 0xFE, 0x18, 0x12]))
+        
+        pipeline = ReverseEngineeringPipeline()
+        first = pipeline.process_file(first_file)
+        first_blocks = dict(first.cfg.basic_blocks)
+        first_procs = dict(first.cfg.procedures)
+        
+        second = pipeline.process_file(second_file)
+        assert second.metadata is not first.metadata
+        assert first.metadata.name == "first"
+        assert first.cfg.basic_blocks == first_blocks
+        assert first.cfg.procedures == first_procs
+        assert first.cfg.basic_blocks is not second.cfg.basic_blocks
+        assert first.instructions is not second.instructions
+    
+    def test_reachability_tracks_cfg_changes(self, branching_file):
+        """Test the reachability score follows blocks and edges added after analysis"""
+        pipeline = ReverseEngineeringPipeline()
+        result = pipeline.process_file(branching_file)
+        cfg = result.cfg
+        assert pipeline.validate_result(result)['scores']['reachability'] == 1.0
+        assert cfg.reachable_blocks() is cfg.reachable_blocks()
+        
+        cfg.add_block(BasicBlock(id="orphan", start_address=0x1000, end_address=0x1001))
+        blocks = len(cfg.basic_blocks)
+        assert pipeline.validate_result(result)['scores']['reachability'] == (blocks - 1) / blocks
+        
+        assert "orphan" not in cfg.reachable_blocks()
+        
+        cfg.add_edge(next(iter(cfg.basic_blocks)), "orphan")
+        assert pipeline.validate_result(result)['scores']['reachability'] == 1.0
+    
+    def test_process_many_matches_serial(self, tmp_path):
+        """Test parallel batch processing returns the serial results in input order"""
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"module{i}.bin"
+            path.write_bytes(bytes([0x05, 0xEF] + [0x18, 0x12] * (i + 3) + [0x07, 0xFE]))
+            paths.append(path)
+        
+        pipeline = ReverseEngineeringPipeline()
+        parallel = pipeline.process_many(paths, workers=2)
+        serial = pipeline.process_many(paths, workers=1)
+        
+        assert list(parallel) == paths
+        for path in paths:
+            assert len(parallel[path].instructions) == len(serial[path].instructions)
+            assert parallel[path].cfg.basic_blocks.keys() == serial[path].cfg.basic_blocks.keys()
+    
+    def test_process_many_applies_on_result_in_workers(self, tmp_path):
+        """Test on_result values come back in place of results, serial or parallel"""
+        paths = [tmp_path / "good.bin", tmp_path / "tiny.bin"]
+        paths[0].write_bytes(bytes([0x05, 0xEF, 0x18, 0x12, 0x18, 0x12, 0x07, 0xFE]))
+        paths[1].write_bytes(bytes([0x07, 0xFE]))  # too small to load
+        
+        pipeline = ReverseEngineeringPipeline()
+        finished = []
+        for workers in (1, 2):
+            outcomes = pipeline.process_many(paths, workers=workers, on_result=_instruction_count,
+                                             progress_callback=finished.append)
+            assert outcomes == {paths[0]: 4, paths[1]: None}
+        assert sorted(finished) == sorted(paths * 2)
     
     def test_ingestion_format_detection(self, tmp_path):
         """Test binary format detection"""
@@ -107,12 +254,96 @@ class TestPipeline:
         
         assert ingestor.load_file(test_file)
         assert ingestor.metadata.format_type in ['load_module', 'unknown']
+    
+    def test_failed_load_releases_mapping(self, branching_file, monkeypatch):
+        """Test a file that fails format parsing is not left mapped"""
+        def fail(self):
+            raise ValueError("bad header")
         
+        monkeypatch.setattr(BinaryIngestor, "_detect_format", fail)
+        ingestor = BinaryIngestor()
+        assert not ingestor.load_file(branching_file)
+        assert ingestor.data == b''
+    
+    @pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+    def test_ingestion_from_pipe(self, tmp_path):
+        """Test a FIFO, which reports no size, is read rather than mapped"""
+        fifo = tmp_path / "module.fifo"
+        os.mkfifo(fifo)
+        data = bytes([0x47, 0xF0] + [0x10, 0x00] * 50)
+        writer = threading.Thread(target=fifo.write_bytes, args=(data,))
+        writer.start()
+        
+        ingestor = BinaryIngestor()
+        try:
+            assert ingestor.load_file(fifo)
+        finally:
+            writer.join()
+        assert bytes(ingestor.data) == data
+    
+    def test_pds_member_name_detection(self):
+        """Test PDS directory names accept letters and digits but not code-page gaps"""
+        ingestor = BinaryIngestor()
+        
+        # PROG01
+        ingestor.data = bytes([0xD7, 0xD9, 0xD6, 0xC7, 0xF0, 0xF1, 0x40, 0x40]) + bytes(12)
+        assert ingestor._has_pds_header()
+        
+        ingestor.data = bytes([0xD7, 0xCA, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40]) + bytes(12)
+        assert not ingestor._has_pds_header()
+    
+    def test_program_object_header(self, tmp_path):
+        """Test program object header, externals and section parsing"""
+        header = struct.pack('>2sHH2xIIHH12x', b'\x00\x03', 1, 2, 64, 0x40, 1, 1)
+        external = bytes([0xD4, 0xC1, 0xC9, 0xD5, 0x40, 0x40, 0x40, 0x40]) + bytes(8)  # MAIN
+        section = struct.pack('>II12x', 0x20, 0x40)
+        
+        test_file = tmp_path / "program_object.bin"
+        test_file.write_bytes(header + external + section + bytes(64))
+        
+        ingestor = BinaryIngestor()
+        assert ingestor.load_file(test_file)
+        assert ingestor.metadata.format_type == "program_object"
+        assert ingestor.metadata.entry_point == 0x40
+        assert ingestor.code_end - ingestor.code_start == 64
+        assert ingestor.metadata.external_symbols == ["MAIN"]
+        assert ingestor.metadata.csect_info == [{'offset': 0x20, 'size': 0x40, 'type': 'text'}]
+        
+    def test_region_classifier(self):
+        """Test sections are classified by the decode rate of their instructions"""
+        code = bytes([0x18, 0x12, 0x1A, 0x12, 0x1B, 0x12, 0x07, 0xFE])  # LR, AR, SR, BCR
+        data = bytes([0x00] * 8)  # Decodes as UNKNOWN
+        program = code + data
+        
+        disasm_result = Disassembler().disassemble(program)
+        classifier = RegionClassifier()
+        regions = classifier.classify(
+            [(0, 7, code), (8, 15, data), (16, 31, b'')], disasm_result.instructions
+        )
+        
+        assert [r.region_type for r in regions] == [
+            RegionType.CODE, RegionType.DATA, RegionType.DATA
+        ]
+        assert regions[0].decode_rate == 1.0
+        assert regions[1].decode_rate == 0.0
+        assert regions[2].evidence == "no_decoded_instructions"
+    
+    def test_constant_pool_between_code(self):
+        """Test a small unknown region between code regions is reclassified as data"""
+        code = bytes([0x18, 0x12, 0x1A, 0x12, 0x1B, 0x12, 0x07, 0xFE])  # LR, AR, SR, BCR
+        mixed = bytes([0x18, 0x12, 0x00, 0x00])  # LR then UNKNOWN - 50% decoded
+        program = code + mixed + code
+        
+        disasm_result = Disassembler().disassemble(program)
+        regions = RegionClassifier().classify(
+            [(0, 7, code), (8, 11, mixed), (12, 19, code)], disasm_result.instructions
+        )
+        
+        assert regions[1].region_type == RegionType.DATA
+        assert regions[1].evidence.startswith("constant_pool_pattern")
+    
     def test_cfg_builder(self):
         """Test CFG construction with branches"""
-        from zos_reverse.disassembler import Disassembler
-        from zos_reverse.cfg_builder import CFGBuilder
-        
         # Create program with conditional branch
         program = bytearray()
         
@@ -149,6 +380,133 @@ class TestPipeline:
                 has_branch_edge = True
                 break
         assert has_branch_edge
+        
+        # Address lookup finds the enclosing block
+        assert cfg.block_containing(0x00).start_address == 0x00
+        assert cfg.block_containing(0x0C).start_address == 0x0A
+        assert cfg.block_containing(0x100) is None
+    
+    def test_unresolved_branches_reported_once(self):
+        """Test each unresolved branch is listed once, in address order"""
+        program = bytearray()
+        program.extend([0x05, 0xEF])  # BALR 14,15
+        program.extend([0x47, 0x80, 0x08, 0x00])  # BC 8,X'800' (outside module)
+        program.extend([0x07, 0xFE])  # BCR 15,14 (return)
+        
+        disasm_result = Disassembler().disassemble(bytes(program))
+        cfg = CFGBuilder().build_cfg(disasm_result)
+        
+        # BALR and BCR are indirect; the BC target lies outside the module
+        assert cfg.unresolved_branches == [0x00, 0x02, 0x06]
+    
+    def test_call_target_labelled_as_procedure(self):
+        """Test a BAL target gets a PROC label even though it has a CFG predecessor"""
+        program = bytearray()
+        program.extend([0x45, 0xE0, 0x00, 0x0A])  # BAL 14,X'0A'
+        program.extend([0x41, 0x10, 0x01, 0x00])  # LA 1,X'100'
+        program.extend([0x07, 0xFE])  # BCR 15,14 (return)
+        program.extend([0x41, 0x20, 0x02, 0x00])  # LA 2,X'200' (subroutine at 0x0A)
+        program.extend([0x07, 0xFE])  # BCR 15,14 (return)
+        
+        disasm_result = Disassembler().disassemble(bytes(program))
+        CFGBuilder().build_cfg(disasm_result)
+        labels = {inst.address: inst.synthetic_label for inst in disasm_result.instructions}
+        
+        assert labels[0x04].startswith("L_")
+        assert labels[0x0A].startswith("PROC_")
+    
+    def test_procedure_detection_long_chain(self):
+        """Test procedure block collection on a chain deeper than the recursion limit"""
+        # 1020 consecutive BC 8,next - each instruction ends its own block
+        program = bytearray()
+        for i in range(1020):
+            target = (i + 1) * 4
+            program.extend([0x47, 0x80, (target >> 8) & 0x0F, target & 0xFF])
+        program.extend([0x07, 0xFE])  # BCR 15,14 (return)
+        
+        disasm_result = Disassembler().disassemble(bytes(program))
+        cfg = CFGBuilder().build_cfg(disasm_result)
+        procedures = ProcedureDetector().detect_procedures(cfg)
+        
+        assert len(procedures) == 1
+        proc = next(iter(procedures.values()))
+        assert len(proc.basic_blocks) == len(cfg.basic_blocks)
+        assert proc.exit_addresses == [1020 * 4]
+    
+    def test_procedure_detection_hand_built_cfg(self):
+        """Test procedure detection on a CFG built with add_block/add_edge"""
+        cfg = ControlFlowGraph(module_name="manual", entry_points=[0])
+        for address in (0, 2, 4):
+            inst = Instruction(address=address, raw_bytes=b"\x07\xfe", hex_bytes="07FE",
+                               mnemonic="BCR", operands=["15", "14"],
+                               is_return=address == 4)
+            cfg.add_block(BasicBlock(id=f"b{address}", start_address=address,
+                                     end_address=address, instructions=[inst]))
+        cfg.add_edge("b0", "b2")
+        cfg.add_edge("b2", "b4")
+        
+        procedures = ProcedureDetector().detect_procedures(cfg)
+        
+        assert len(procedures) == 1
+        proc = next(iter(procedures.values()))
+        assert proc.basic_blocks == ["b0", "b2", "b4"]
+        assert proc.exit_addresses == [4]
+    
+    def test_pseudocode_deep_nesting(self):
+        """Test pseudocode generation for nesting deeper than the recursion limit"""
+        # 700 nested IFs from consecutive BC 8,next
+        program = bytearray()
+        for i in range(700):
+            target = (i + 1) * 4
+            program.extend([0x47, 0x80, (target >> 8) & 0x0F, target & 0xFF])
+        program.extend([0x07, 0xFE])  # BCR 15,14 (return)
+        
+        disasm_result = Disassembler().disassemble(bytes(program))
+        cfg = CFGBuilder().build_cfg(disasm_result)
+        ProcedureDetector().detect_procedures(cfg)
+        lines = PseudocodeGenerator().generate(cfg).splitlines()
+        
+        assert sum(line.lstrip().startswith("IF ") for line in lines) == 700
+        assert sum(line.lstrip().startswith("END IF") for line in lines) == 700
+        assert lines[-1].startswith("END PROCEDURE")
+    
+    def test_loop_headers_from_back_edges(self):
+        """Test loop headers come from cycles, not from any backward jump"""
+        def loop_count(program):
+            disasm_result = Disassembler().disassemble(bytes(program))
+            cfg = CFGBuilder().build_cfg(disasm_result)
+            ProcedureDetector().detect_procedures(cfg)
+            lines = PseudocodeGenerator().generate(cfg).splitlines()
+            return sum(line.lstrip().startswith("LOOP ") for line in lines)
+        
+        # BC 15,X'06'; BCR 15,14; BC 15,X'04' - jumps backward but never cycles
+        assert loop_count([0x47, 0xF0, 0x00, 0x06, 0x07, 0xFE, 0x47, 0xF0, 0x00, 0x04]) == 0
+        
+        # LR 1,2; LR 3,4; BC 4,X'02'; BCR 15,14 - block at 0x02 loops on itself
+        assert loop_count([0x18, 0x12, 0x18, 0x34, 0x47, 0x40, 0x00, 0x02, 0x07, 0xFE]) == 1
+    
+    def test_pseudocode_independent_of_hash_seed(self):
+        """Test an irreducible loop gets the same header under any PYTHONHASHSEED"""
+        # BC 8,X'0A'; LR 1,2; BC 15,X'0A'; LR 3,4; BC 4,X'04'; BCR 15,14 - the
+        # cycle between 0x04 and 0x0A is entered at both blocks
+        program = [0x47, 0x80, 0x00, 0x0A, 0x18, 0x12, 0x47, 0xF0, 0x00, 0x0A,
+                   0x18, 0x34, 0x47, 0x40, 0x00, 0x04, 0x07, 0xFE]
+        script = (
+            "import sys\n"
+            "from zos_reverse.cfg_builder import CFGBuilder, ProcedureDetector\n"
+            "from zos_reverse.disassembler import Disassembler\n"
+            "from zos_reverse.pseudocode import PseudocodeGenerator\n"
+            f"cfg = CFGBuilder().build_cfg(Disassembler().disassemble(bytes({program})))\n"
+            "ProcedureDetector().detect_procedures(cfg)\n"
+            "sys.stdout.write(PseudocodeGenerator().generate(cfg))\n"
+        )
+        
+        outputs = set()
+        for seed in range(6):
+            env = dict(os.environ, PYTHONHASHSEED=str(seed))
+            outputs.add(subprocess.run([sys.executable, "-c", script], env=env, check=True,
+                                       capture_output=True, text=True).stdout)
+        assert len(outputs) == 1
 
 
 class TestReporting:
@@ -156,9 +514,6 @@ class TestReporting:
     
     def test_report_formats(self, tmp_path):
         """Test different output formats"""
-        from zos_reverse.reporter import ReportWriter
-        from zos_reverse.ir import DisassemblyResult, ModuleMetadata, ControlFlowGraph
-        
         # Create minimal result
         metadata = ModuleMetadata(name="TEST", format_type="load_module")
         cfg = ControlFlowGraph(module_name="TEST", entry_points=[0])
@@ -181,6 +536,88 @@ class TestReporting:
         # Check files exist
         for fmt, path in files.items():
             assert path.exists()
+    
+    def test_report_formats_share_timestamp(self, tmp_path):
+        """Test every format in one report set carries the same timestamp"""
+        result = DisassemblyResult(
+            metadata=ModuleMetadata(name="TEST", format_type="load_module"),
+            instructions=[],
+            cfg=ControlFlowGraph(module_name="TEST", entry_points=[0]),
+            unknown_regions=[],
+            statistics={}
+        )
+        files = ReportWriter(tmp_path).write_reports(result, formats=['text', 'yaml', 'json'])
+        
+        timestamp = json.loads(files['json'].read_text())['timestamp']
+        assert yaml.safe_load(files['yaml'].read_text())['timestamp'] == timestamp
+        assert f"Generated: {timestamp}\n" in files['text'].read_text()
+    
+    def test_portfolio_index_from_summaries(self, tmp_path, branching_file):
+        """Test the portfolio index is the same built from results or from summaries"""
+        result = ReverseEngineeringPipeline().process_file(branching_file)
+        
+        def index(modules, name):
+            index_file = ReportWriter(tmp_path / name).write_portfolio_index(modules)
+            data = yaml.safe_load(index_file.read_text())
+            del data['timestamp']
+            return data
+        
+        summary = ModuleSummary.from_result("module", result)
+        assert summary.procedure_count == len(result.cfg.procedures)
+        assert index({"module": summary}, "summaries") == index({"module": result}, "results")
+    
+    def test_listings_stream_to_file(self, branching_file):
+        """Test streamed listings match the returned strings"""
+        result = ReverseEngineeringPipeline().process_file(branching_file)
+        
+        out = io.StringIO()
+        assert AssemblerReconstructor().reconstruct(result, out=out) is None
+        assert out.getvalue() == AssemblerReconstructor().reconstruct(result)
+        
+        out = io.StringIO()
+        assert PseudocodeGenerator().generate(result.cfg, out=out) is None
+        assert out.getvalue() == PseudocodeGenerator().generate(result.cfg)
+    
+    def test_failed_listing_leaves_no_file(self, tmp_path, branching_file, monkeypatch):
+        """Test a rendering error does not leave a truncated listing behind"""
+        def fail_midway(self, result, out=None):
+            out.write("* partial listing\n")
+            raise ValueError("rendering failed")
+        
+        monkeypatch.setattr(AssemblerReconstructor, "reconstruct", fail_midway)
+        result = ReverseEngineeringPipeline().process_file(branching_file)
+        
+        out_dir = tmp_path / "out"
+        with pytest.raises(ValueError):
+            ReportWriter(out_dir).write_reports(result, base_name="module", formats=['asm'])
+        assert list(out_dir.iterdir()) == []
+    
+    def test_jsonl_report_streams_all_records(self, tmp_path):
+        """Test the JSONL report writes one parseable record per line"""
+        program = tmp_path / "module.bin"
+        program.write_bytes(bytes([
+            0x45, 0xE0, 0x00, 0x0A,  # BAL 14,X'0A'
+            0x41, 0x10, 0x01, 0x00,  # LA 1,X'100'
+            0x07, 0xFE,              # BCR 15,14 (return)
+            0x41, 0x20, 0x02, 0x00,  # LA 2,X'200' (subroutine at 0x0A)
+            0x07, 0xFE,              # BCR 15,14 (return)
+        ]))
+        result = ReverseEngineeringPipeline().process_file(program)
+        cfg = result.cfg
+        
+        files = ReportWriter(tmp_path).write_reports(result, formats=['jsonl'])
+        records = [json.loads(line) for line in files['jsonl'].read_text().splitlines()]
+        
+        assert records[0]['record'] == 'module'
+        kinds = [r['record'] for r in records]
+        assert kinds.count('instruction') == len(result.instructions)
+        assert kinds.count('block') == len(result.cfg.basic_blocks)
+        assert kinds.count('procedure') == len(cfg.procedures)
+        
+        calls = [r for r in records if r['record'] == 'call_graph']
+        assert calls and {r['caller']: set(r['callees']) for r in calls} == cfg.call_graph
+        unresolved = [r['address'] for r in records if r['record'] == 'unresolved']
+        assert unresolved and unresolved == cfg.to_dict()['unresolved']
 
 
 if __name__ == '__main__':